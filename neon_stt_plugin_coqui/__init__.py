@@ -28,19 +28,29 @@
 
 
 import numpy as np
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 import os
 from neon_utils.logger import LOG
 import os.path
-import shlex
-import subprocess
-import wave
-import yaml
-from pipes import quote
-import deepspeech
 from speech_recognition import AudioData
+from threading import Event, Thread
+from time import monotonic
 
-import requests
+from neon_stt_plugin_coqui.audio_utils import convert_audio, pcm_to_int16, \
+    preprocess, preprocessing_options, read_wav
+from neon_stt_plugin_coqui.manifest import load_manifest
+from neon_stt_plugin_coqui.model_cache import DEFAULT_CACHE_DIR, \
+    download_file, model_paths
+from neon_stt_plugin_coqui.model_pool import MODEL_POOL, PooledModel
+from neon_stt_plugin_coqui.async_executor import AsyncExecutor, \
+    DecoderSaturatedError
+from neon_stt_plugin_coqui.batch import BatchTranscriber
+from neon_stt_plugin_coqui.language_id import detect_language
+from neon_stt_plugin_coqui.long_form import transcribe_long
+from neon_stt_plugin_coqui.metadata import metadata_to_list
+from neon_stt_plugin_coqui.metrics import configure_metrics, \
+    get_metrics_sink, sample_profile, timed
+from neon_stt_plugin_coqui.result_cache import TranscriptionCache
 
 try:
     from neon_speech.stt import STT
@@ -48,6 +58,16 @@ except ImportError:
     from ovos_plugin_manager.templates.stt import STT
 
 
+# Beam widths for named decoding profiles. A larger beam width generates
+# better results at the cost of decoding time
+DECODING_PROFILES = {
+    'fast': 100,
+    'balanced': 500,
+    'accurate': 1024
+}
+MIN_BEAM_WIDTH = 16
+
+
 class CoquiSTT(STT):
     def __init__(self, config: dict = None):
         if isinstance(config, str):
@@ -55,22 +75,182 @@ class CoquiSTT(STT):
             config = {"lang": config}
         config = config or dict()
         super().__init__(config)
+        self._config = config
 
+        self.manifest = load_manifest(config.get('model_manifest'))
+        # Language codes like `en-us` are mapped onto manifest languages;
+        # unsupported ones raise RuntimeError
         self.lang = config.get('lang') or 'en'
+        self.language_candidates = [
+            self.manifest.get(lang).lang
+            for lang in config.get('language_candidates') or []]
+        self.auto_language = self.lang == 'auto'
+        if self.auto_language:
+            if not self.language_candidates:
+                raise ValueError("language_candidates required for "
+                                 "lang: auto")
+            self.lang = self.language_candidates[0]
+        self.lang = self.manifest.get(self.lang).lang
+        self.language_probe_seconds = \
+            config.get('language_probe_seconds') or 3.0
+        self.language_probe_budget = config.get('language_probe_budget') or 0.5
+        self.language_probe_beam_width = \
+            config.get('language_probe_beam_width') or 50
         self.hotwords = config.get('hotwords') or self.hot_word_adding()
         self.hotword_boost = config.get('hotword_boost') or 5.0
+        self.cache_dir = os.path.expanduser(config.get('cache_dir') or
+                                            DEFAULT_CACHE_DIR)
+        if config.get('metrics'):
+            configure_metrics(config['metrics'])
+        self.profile_sample_rate = config.get('profile_sample_rate') or 0
+        if config.get('model_memory_budget_mb'):
+            MODEL_POOL.memory_budget = \
+                int(config['model_memory_budget_mb']) * 1024 * 1024
+
+        # Decoder settings; unset values fall back to the manifest defaults
+        profile = config.get('decoding_profile')
+        if profile and profile not in DECODING_PROFILES:
+            raise ValueError(f"Unknown decoding_profile: {profile}")
+        self.beam_width = int(config.get('beam_width') or
+                              DECODING_PROFILES.get(profile) or 0) or None
+        if config.get('lm_alpha') is not None and \
+                config.get('lm_beta') is not None:
+            self.alpha_beta = (float(config['lm_alpha']),
+                               float(config['lm_beta']))
+        else:
+            self.alpha_beta = None
+        self.adaptive_beam_width = config.get('adaptive_beam_width', False)
+        self.latency_budget = config.get('latency_budget')
+        self.long_utterance_length = config.get('long_utterance_length') or 10
+        # `preprocessing: true` enables the default preprocessing options
+        preprocessing = config.get('preprocessing')
+        if preprocessing:
+            self.preprocessing = preprocessing_options(
+                preprocessing if isinstance(preprocessing, dict) else None)
+        else:
+            self.preprocessing = None
+
+        if config.get('result_cache'):
+            cache_config = config['result_cache']
+            self.result_cache = TranscriptionCache(
+                cache_config.get('max_entries') or 1024,
+                cache_config.get('ttl'), cache_config.get('sqlite_path'))
+        else:
+            self.result_cache = None
+
+        self._stream = None
+        self._batch = None
+        self.batch_workers = config.get('batch_workers')
+        self.async_processes = config.get('async_processes', False)
+        self._async = AsyncExecutor(config.get('async_workers') or
+                                    (self.batch_workers
+                                     if self.async_processes else None),
+                                    config.get('async_max_pending'))
 
         # Model creation
-        model, scorer = self.download_coqui_model()
+        self._ready = Event()
+        self._load_error = None
+        if config.get('lazy_load'):
+            Thread(target=self._warm_up, daemon=True).start()
+        else:
+            self._get_pooled_model(self.lang)
+            self._ready.set()
+
+    @property
+    def loading_state(self) -> str:
+        """
+        `loading` until the default model is loaded, then `ready`, or
+        `error` if loading failed and the model has not been loaded since
+        """
+        if self._load_error:
+            if self.lang not in MODEL_POOL.loaded_languages:
+                return "error"
+            # A later request loaded the model through the pool
+            self._load_error = None
+        return "ready" if self._ready.is_set() else "loading"
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """
+        Blocks until the default model is loaded.
+
+        Parameters:
+                    timeout (float): max seconds to wait, None to wait forever
+        Returns:
+                    (bool): True if the model is ready
+        """
+        self._ready.wait(timeout)
+        return self.loading_state == "ready"
+
+    def _warm_up(self):
+        """
+        Loads the default model and decodes a short silence so the first
+        request does not pay one-time decoder setup costs.
+        """
         try:
-            LOG.info(f"Loading model file: {model}")
-            model = deepspeech.Model(model)
+            pooled = self._get_pooled_model(self.lang)
+            silence = np.zeros(pooled.model.sampleRate() // 2, dtype=np.int16)
+            with pooled.lock:
+                self._apply_decoder_settings(pooled)
+                pooled.model.stt(silence)
+            LOG.info(f"Model ready: {self.lang}")
+        except Exception as e:
+            LOG.exception(e)
+            self._load_error = e
+        finally:
+            self._ready.set()
+
+    @property
+    def model(self):
+        """
+        Model for the default language of this instance
+        """
+        return self._get_pooled_model(self.lang).model
+
+    def hot_word_adding(self, lang: str = None):
+        lang = lang or self.lang
+        if lang in ['uk', 'ru']:
+            return {lang: 'неон'}
+        else:
+            return {lang: 'neon'}
+
+    def resolve_lang(self, language: Optional[str]) -> str:
+        """
+        Maps a requested language code onto a supported model language.
+
+        Parameters:
+                    language (str): language code, i.e. `en` or `en-us`
+        Returns:
+                    lang (str): key of the model in the model manifest
+        """
+        if not language:
+            return self.lang
+        return self.manifest.get(language).lang
+
+    def _get_pooled_model(self, lang: str) -> PooledModel:
+        return MODEL_POOL.get(lang, self._load_model)
+
+    def _load_model(self, lang: str) -> PooledModel:
+        """
+        Downloads (if needed) and loads the model and scorer for a language.
+
+        Parameters:
+                    lang (str): language code
+        Returns:
+                    (PooledModel): loaded model
+        """
+        import deepspeech
+        model_path, scorer = self.download_coqui_model(lang)
+        sample_rate = self.manifest[lang].sample_rate
+        load_start = monotonic()
+        try:
+            LOG.info(f"Loading model file: {model_path}")
+            model = deepspeech.Model(model_path)
         except RuntimeError as e:
             LOG.exception(e)
             LOG.warning("Retrying model download")
-            os.remove(model)
-            model, scorer = self.download_coqui_model()
-            model = deepspeech.Model(model)
+            os.remove(model_path)
+            model_path, scorer = self.download_coqui_model(lang)
+            model = deepspeech.Model(model_path)
 
         # Adding scorer
         if scorer:
@@ -79,88 +259,193 @@ class CoquiSTT(STT):
             except RuntimeError as e:
                 LOG.exception(e)
                 LOG.error(f"Not loading external scorer: {scorer}")
-        # setting beam width A larger beam width value generates better results at the cost of decoding time
-        beam_width = 500
-        model.setBeamWidth(beam_width)
-        self.model = model
+                scorer = None
+        if model.sampleRate() != sample_rate:
+            LOG.warning(f"{lang} model sample rate is {model.sampleRate()}, "
+                        f"manifest says {sample_rate}")
+        get_metrics_sink().observe("model_load_seconds",
+                                   monotonic() - load_start, {"lang": lang})
 
+        size = os.path.getsize(model_path)
         if scorer:
-            LOG.info("Adding hot word to model")
-            LOG.info(self.hotwords[self.lang])
-            LOG.info(self.hotword_boost)
-            self.model.addHotWord(self.hotwords[self.lang], self.hotword_boost)
-
-    def hot_word_adding(self):
-        if self.lang in ['uk', 'ru']:
-            return {self.lang: 'неон'}
-        else:
-            return {self.lang: 'neon'}
+            size += os.path.getsize(scorer)
+        return PooledModel(lang, model, scorer, size)
+
+    def get_hotwords(self, lang: str,
+                     hotwords: Optional[Dict[str, float]] = None) \
+            -> Dict[str, float]:
+        """
+        Returns the hot words to decode with, combining this instance's
+        configured hot word with request-specific ones.
+
+        Parameters:
+                    lang (str): model language
+                    hotwords (dict): request hot words mapped to boost values
+        Returns:
+                    (dict): hot words mapped to boost values
+        """
+        hotword = self.hotwords.get(lang) or self.hot_word_adding(lang)[lang]
+        return {hotword: self.hotword_boost, **(hotwords or {})}
+
+    def get_beam_width(self, lang: str) -> int:
+        """
+        Returns the configured beam width, or the manifest default for a
+        language.
 
+        Parameters:
+                    lang (str): model language
+        Returns:
+                    (int): beam width
+        """
+        return self.beam_width or self.manifest[lang].beam_width or \
+            DECODING_PROFILES['balanced']
+
+    def get_alpha_beta(self, lang: str) -> Optional[Tuple[float, float]]:
+        """
+        Returns the configured scorer (alpha, beta), or the manifest default
+        for a language.
+
+        Parameters:
+                    lang (str): model language
+        Returns:
+                    (tuple): alpha and beta, None to use the scorer's values
+        """
+        return self.alpha_beta or self.manifest[lang].alpha_beta
+
+    def _apply_decoder_settings(self, pooled: PooledModel,
+                                beam_width: int = None,
+                                hotwords: Optional[Dict[str, float]] = None):
+        """
+        Sets this instance's decoder settings on a shared model if they
+        differ from the current ones. Must be called while holding
+        `pooled.lock` up to creating the stream to decode with, which copies
+        the beam width and hot words and keeps its own reference to the
+        scorer; settings therefore do not leak into concurrent decodes and
+        are replaced by the next decode that requests different ones.
+
+        Parameters:
+                    pooled (PooledModel): model to configure
+                    beam_width (int): beam width override for this decode
+                    hotwords (dict): request hot words mapped to boost values
+        """
+        beam_width = beam_width or self.get_beam_width(pooled.lang)
+        if pooled.beam_width != beam_width:
+            pooled.model.setBeamWidth(beam_width)
+            pooled.beam_width = beam_width
+        if not pooled.scorer:
+            return
+        alpha_beta = self.get_alpha_beta(pooled.lang)
+        if pooled.alpha_beta != alpha_beta:
+            # Streams share the model's scorer instead of copying it, so the
+            # scorer is reloaded rather than changed under in-flight decodes.
+            # Reloading also restores the scorer's own weights when this
+            # instance does not override them.
+            LOG.debug(f"Setting scorer alpha, beta: {alpha_beta}")
+            pooled.model.enableExternalScorer(pooled.scorer)
+            if alpha_beta:
+                pooled.model.setScorerAlphaBeta(*alpha_beta)
+            pooled.alpha_beta = alpha_beta
+
+        hotwords = self.get_hotwords(pooled.lang, hotwords)
+        if pooled.hotwords == hotwords:
+            return
+        LOG.debug(f"Setting hot words: {hotwords}")
+        for word, boost in pooled.hotwords.items():
+            if hotwords.get(word) != boost:
+                pooled.model.eraseHotWord(word)
+        for word, boost in hotwords.items():
+            if pooled.hotwords.get(word) != boost:
+                pooled.model.addHotWord(word, boost)
+        pooled.hotwords = hotwords
+
+    def select_beam_width(self, pooled: PooledModel, audio_length: float,
+                          latency_budget: float = None) -> int:
+        """
+        Selects the beam width for a decode. In adaptive mode, the beam width
+        is reduced for long utterances and when the estimated decode time
+        would exceed the latency budget.
 
-    def get_model(self, model_url: str, scorer_url: Optional[str]):
+        Parameters:
+                    pooled (PooledModel): model to decode with
+                    audio_length (float): seconds of audio to decode
+                    latency_budget (float): max seconds to spend decoding
+        Returns:
+                    beam_width (int): beam width to decode with
+        """
+        beam_width = default_beam_width = self.get_beam_width(pooled.lang)
+        if not self.adaptive_beam_width:
+            return beam_width
+        if audio_length > self.long_utterance_length:
+            beam_width = int(beam_width * self.long_utterance_length /
+                             audio_length)
+        latency_budget = latency_budget or self.latency_budget
+        estimate = pooled.estimate_decode_time(audio_length, beam_width)
+        if latency_budget and estimate and estimate > latency_budget:
+            beam_width = int(beam_width * latency_budget / estimate)
+        return max(beam_width, min(MIN_BEAM_WIDTH, default_beam_width))
+
+    def get_model(self, model_url: str, scorer_url: Optional[str],
+                  lang: str = None, model_sha256: Optional[str] = None,
+                  scorer_sha256: Optional[str] = None,
+                  model_size: Optional[int] = None,
+                  scorer_size: Optional[int] = None):
         '''
         Downloading model and scorer for the specific language
         from CoQui models web-page: https://coqui.ai/models.
-        Creating model and a scorer files in ~/.local/share/neon/
+        Creating model and a scorer files in the configured cache_dir
+        (~/.local/share/neon/ by default)
 
         Parameters:
                     model_url (str): url to model downloading in .pbmm format
                     scorer_url (str): url to scorer downloading in .scorer format
+                    lang (str): language of the model, defaults to self.lang
+                    model_sha256 (str): expected sha256 of the model file
+                    scorer_sha256 (str): expected sha256 of the scorer file
+                    model_size (int): expected bytes of the model file
+                    scorer_size (int): expected bytes of the scorer file
 
         Returns:
                     model, scorer (tuple): tuple that contains pathes to model and scorer
         '''
+        lang = lang or self.lang
         try:
-            if not os.path.isdir(os.path.expanduser("~/.local/share/neon/")):
-                os.makedirs(os.path.expanduser("~/.local/share/neon/"))
-            if model_url:
-                model_path = os.path.expanduser(f"~/.local/share/neon/coqui-{self.lang}-models.pbmm")
-                if not os.path.isfile(model_path):
-                    LOG.info(f"Downloading {model_url}")
-                    model = requests.get(model_url, allow_redirects=True)
-                    with open(model_path, "wb") as out:
-                        out.write(model.content)
-                    LOG.info(f"Model Downloaded to {model_path}")
-            else:
+            if not model_url:
                 raise ValueError("Null model_url passed")
+            model_path, scorer_path = model_paths(lang, self.cache_dir)
+            download_file(model_url, model_path, model_sha256, model_size)
 
             if scorer_url:
-                scorer_path = os.path.expanduser(f"~/.local/share/neon/coqui-{self.lang}-models.scorer")
-                if not os.path.isfile(scorer_path):
-                    LOG.info(f"Downloading {scorer_url}")
-                    scorer = requests.get(scorer_url, allow_redirects=True)
-                    with open(scorer_path, "wb") as out:
-                        out.write(scorer.content)
-                    LOG.info(f"Scorer Downloaded to {scorer_path}")
+                download_file(scorer_url, scorer_path, scorer_sha256,
+                              scorer_size)
             else:
                 scorer_path = None
-                  
+
             return model_path, scorer_path
         except Exception as e:
-            LOG.info(f"Error getting deepspeech models! {e}")
+            LOG.error(f"Error getting deepspeech models! {e}")
+            raise
 
-    def download_coqui_model(self):
+    def download_coqui_model(self, lang: str = None):
         '''
-        Parsing yaml file with model and scorer urls
+        Looks up model and scorer urls in the model manifest
         Calls get_model() function for model and scorer downloading
         from CoQui models web-page: https://coqui.ai/models.
 
+        Parameters:
+                    lang (str): language of the model, defaults to self.lang
+
         Returns:
                     model, scorer (tuple): tuple that contains pathes to model and scorer
         '''
-        credentials_path = os.path.dirname(os.path.abspath(__file__))+'/coqui_models.yml'
-        with open(credentials_path, 'r') as json_file:
-            models_dict = yaml.load(json_file, Loader=yaml.FullLoader)
-        if self.lang not in models_dict.keys():
-            raise RuntimeError(f"{self.lang} is not supported")
-        if models_dict[self.lang]['scorer_url'] != "":
-            model, scorer = \
-                self.get_model(models_dict[self.lang]['model_url'],
-                               models_dict[self.lang]['scorer_url'])
-            return model, scorer
-        else:
-            model, scorer = self.get_model(models_dict[self.lang]['model_url'],  None)
-            return model, scorer
+        lang = lang or self.lang
+        if lang not in self.manifest:
+            raise RuntimeError(f"{lang} is not supported")
+        info = self.manifest[lang]
+        model, scorer = \
+            self.get_model(info.model_url, info.scorer_url, lang,
+                           info.model_sha256, info.scorer_sha256,
+                           info.model_size, info.scorer_size)
+        return model, scorer
 
     def convert_samplerate(self, audio, desired_sample_rate):
     
@@ -175,17 +460,8 @@ class CoquiSTT(STT):
         Returns:
                     (numpy array): buffer output of audio
         """
-        
-        sox_cmd = 'sox {} --type raw --bits 16 --channels 1 --rate {} --encoding signed-integer --endian little --compression 0.0 --no-dither - '.format(
-            quote(audio), desired_sample_rate)
-        try:
-            output = subprocess.check_output(shlex.split(sox_cmd), stderr=subprocess.PIPE)
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError('SoX returned non-zero status: {}'.format(e.stderr))
-        except OSError as e:
-            raise OSError(e.errno,
-                          'SoX not found, use {}hz files or install it: {}'.format(desired_sample_rate, e.strerror))
-        return np.frombuffer(output, np.int16)
+        data, sample_rate, channels = read_wav(audio)
+        return convert_audio(data, sample_rate, desired_sample_rate, channels)
 
     def get_audio_data(self, audio_path):
 
@@ -193,8 +469,8 @@ class CoquiSTT(STT):
         Constructs an AudioData instance with the same parameters
         as the source and the specified frame_data.
 
-        Converts audio samplerate if the original 
-        samplerate doesn't satisfy model sample rate.
+        Converts audio samplerate and channels if they don't
+        satisfy the model.
 
         Parameters:
                     audio_path (str): path to audio file
@@ -204,43 +480,446 @@ class CoquiSTT(STT):
                     audio_data (AudioData): audio data of the input audio file
         """
         
-        fin = wave.open(audio_path, 'rb')
-
+        audio, fs_orig, channels = read_wav(audio_path)
         desired_sample_rate = self.model.sampleRate()
-        desired_sample_width = fin.getsampwidth()
-
-        # samplerate conversion
-        fs_orig = fin.getframerate()
-        if fs_orig != desired_sample_rate:
-            LOG.info(f'Warning: original sample rate ({fs_orig}) is different '
-                     f'than {desired_sample_rate}hz. Resampling might produce '
-                     f'erratic speech recognition.')
-            audio = self.convert_samplerate(audio_path, desired_sample_rate)
-        else:
-            audio = np.frombuffer(fin.readframes(fin.getnframes()), np.int16)
-        audio_data = AudioData(audio, desired_sample_rate,
-                               desired_sample_width)
 
         # getting audio length
-        audio_length = fin.getnframes() * (1 / fs_orig)
-        fin.close()
+        audio_length = len(audio) / channels / fs_orig
+
+        # samplerate conversion
+        # 16-bit mono audio at the model rate stays memory-mapped
+        if fs_orig != desired_sample_rate or channels != 1:
+            LOG.debug(f'Resampling audio from {fs_orig} '
+                      f'to {desired_sample_rate}hz')
+            with timed("resample_seconds"):
+                audio = convert_audio(audio, fs_orig, desired_sample_rate,
+                                      channels)
+        audio_data = AudioData(audio, desired_sample_rate, 2)
 
         return audio_length, audio_data
-    
-    def execute(self, audio: AudioData, language: str = None):
+
+    def execute(self, audio: AudioData, language: str = None,
+                latency_budget: float = None,
+                hotwords: Optional[Dict[str, float]] = None):
         '''
         Executes speach recognition
 
         Parameters:
                     audio (AudioData): AudioData of the input audio
                     language (str): language code associated with audio
+                    latency_budget (float): max seconds to spend decoding,
+                        used in adaptive beam width mode
+                    hotwords (dict): words to boost for this request only,
+                        mapped to boost values
         Returns:
                     text (str): recognized text
         '''
-        # TODO: Handle models per-language
-        if audio.sample_rate != self.model.sampleRate():
-            LOG.warning(f"Audio SR ({audio.sample_rate}) "
-                        f"different from model: {self.model.sampleRate()}")
-        transcription = str(self.model.stt(np.frombuffer(audio.get_raw_data(),
-                                                         dtype=np.int16)))
+        if not self.result_cache:
+            language = self._select_language(audio, language)
+            return str(self._decode(audio, language, latency_budget,
+                                    hotwords=hotwords))
+        # Look up auto-detected audio by its candidate languages so repeated
+        # clips skip the probe decodes too
+        if self._detects_language(language):
+            langs = self.language_candidates
+        else:
+            langs = [self.resolve_lang(language)]
+        key = self._result_cache_key(audio, langs, hotwords)
+        transcription = self.result_cache.get(key)
+        if transcription is None:
+            language = self._select_language(audio, language)
+            transcription = str(self._decode(audio, language, latency_budget,
+                                             hotwords=hotwords))
+            self.result_cache.put(key, transcription)
         return transcription
+
+    def _result_cache_key(self, audio: AudioData, langs: List[str],
+                          hotwords: Optional[Dict[str, float]]) -> str:
+        '''
+        Builds a result cache key from the audio and every setting that
+        changes the transcription.
+
+        Parameters:
+                    audio (AudioData): AudioData of the input audio
+                    langs (list): resolved model language, or the candidate
+                        languages if the language is detected
+                    hotwords (dict): request hot words
+        Returns:
+                    (str): cache key
+        '''
+        models = []
+        for lang in langs:
+            info = self.manifest[lang]
+            models.append((lang, info.version, info.model_url,
+                           info.scorer_url, self.get_beam_width(lang),
+                           self.get_alpha_beta(lang),
+                           sorted(self.get_hotwords(lang, hotwords).items())))
+        probe = (self.language_probe_seconds, self.language_probe_beam_width) \
+            if len(langs) > 1 else None
+        return TranscriptionCache.make_key(
+            self._to_int16(audio), audio.sample_rate, models, probe,
+            self.adaptive_beam_width,
+            sorted((self.preprocessing or {}).items()))
+
+    def execute_with_metadata(self, audio: AudioData, language: str = None,
+                              num_results: int = 3,
+                              latency_budget: float = None,
+                              hotwords: Optional[Dict[str, float]] = None) \
+            -> List[dict]:
+        '''
+        Executes speech recognition and returns candidate transcripts with
+        word timings from the same decode.
+
+        Parameters:
+                    audio (AudioData): AudioData of the input audio
+                    language (str): language code associated with audio
+                    num_results (int): max candidate transcripts to return
+                    latency_budget (float): max seconds to spend decoding,
+                        used in adaptive beam width mode
+                    hotwords (dict): words to boost for this request only,
+                        mapped to boost values
+        Returns:
+                    (list): dicts with `transcript`, `confidence` and `words`,
+                        best candidate first. Each word has `word`,
+                        `start_time` and `end_time` in seconds
+        '''
+        language = self._select_language(audio, language)
+        return self._decode(audio, language, latency_budget, num_results,
+                            hotwords)
+
+    def _select_language(self, audio: AudioData,
+                         language: Optional[str]) -> Optional[str]:
+        '''
+        Returns the detected language if `language` is `auto`, or if no
+        language is given and the plugin is configured with `lang: auto`.
+        '''
+        if self._detects_language(language):
+            return self.detect_language(audio)
+        return language
+
+    def _detects_language(self, language: Optional[str]) -> bool:
+        return language == 'auto' or (not language and self.auto_language)
+
+    def detect_language(self, audio: AudioData,
+                        candidates: List[str] = None) -> str:
+        '''
+        Identifies the language of an utterance by decoding its leading
+        seconds with each candidate model and comparing confidence. Each
+        probe stops feeding audio once `language_probe_budget` seconds have
+        been spent on it.
+
+        Parameters:
+                    audio (AudioData): AudioData of the input audio
+                    candidates (list): language codes to try, defaults to
+                        configured `language_candidates`
+        Returns:
+                    (str): detected language code
+        '''
+        candidates = [self.resolve_lang(lang) for lang in
+                      candidates or self.language_candidates or [self.lang]]
+        if len(candidates) == 1:
+            return candidates[0]
+        with timed("language_detect_seconds"):
+            lang = detect_language(self, self._to_int16(audio),
+                                   audio.sample_rate, candidates,
+                                   self.language_probe_seconds,
+                                   self.language_probe_beam_width,
+                                   self.language_probe_budget)
+        LOG.info(f"Detected language: {lang}")
+        return lang
+
+    def _decode(self, audio: AudioData, language: Optional[str],
+                latency_budget: Optional[float], num_results: int = None,
+                hotwords: Optional[Dict[str, float]] = None):
+        '''
+        Decodes audio with the model for the requested language.
+
+        Parameters:
+                    audio (AudioData): AudioData of the input audio
+                    language (str): language code associated with audio
+                    latency_budget (float): max seconds to spend decoding
+                    num_results (int): if set, return this many candidate
+                        transcripts with word timings instead of text
+                    hotwords (dict): request hot words
+        Returns:
+                    (str, list): text, or transcripts as returned by
+                        `metadata_to_list`
+        '''
+        lang = self.resolve_lang(language)
+        pooled = self._get_pooled_model(lang)
+        model = pooled.model
+        audio_buffer = self._to_int16(audio)
+        if audio.sample_rate != model.sampleRate():
+            LOG.debug(f"Resampling audio from {audio.sample_rate} "
+                      f"to {model.sampleRate()}hz")
+            with timed("resample_seconds"):
+                audio_buffer = convert_audio(audio_buffer, audio.sample_rate,
+                                             model.sampleRate())
+        metrics = get_metrics_sink()
+        tags = {"lang": lang}
+        offset = 0
+        if self.preprocessing:
+            input_length = len(audio_buffer)
+            with timed("preprocess_seconds", tags):
+                audio_buffer, offset = preprocess(
+                    audio_buffer, model.sampleRate(), self.preprocessing)
+            metrics.increment("trimmed_seconds",
+                              (input_length - len(audio_buffer)) /
+                              model.sampleRate(), tags)
+        audio_length = len(audio_buffer) / model.sampleRate()
+        beam_width = self.select_beam_width(pooled, audio_length,
+                                            latency_budget)
+        # Streams copy the beam width and hot words and keep a reference to
+        # the current scorer when created, so the lock is only needed until
+        # then and decodes on one model run concurrently
+        with pooled.lock:
+            self._apply_decoder_settings(pooled, beam_width, hotwords)
+            stream = model.createStream()
+        with sample_profile(self.profile_sample_rate, f"decode ({lang})"):
+            decode_start = monotonic()
+            try:
+                stream.feedAudioContent(audio_buffer)
+            except Exception:
+                stream.freeStream()
+                raise
+            if num_results:
+                result = stream.finishStreamWithMetadata(num_results)
+            else:
+                result = stream.finishStream()
+            decode_time = monotonic() - decode_start
+        with pooled.lock:
+            pooled.update_decode_cost(decode_time, audio_length, beam_width)
+
+        metrics.observe("decode_seconds", decode_time, tags)
+        metrics.increment("audio_seconds", audio_length, tags)
+        if audio_length:
+            metrics.observe("real_time_factor", decode_time / audio_length,
+                            tags)
+        if num_results:
+            return metadata_to_list(result, offset / model.sampleRate())
+        return result
+
+    @staticmethod
+    def _to_int16(data: Union[bytes, np.ndarray, AudioData]) -> np.ndarray:
+        """
+        Returns audio as an int16 numpy array, without copying int16 input.
+
+        Parameters:
+                    data (bytes, numpy array, AudioData): PCM audio; bytes
+                        are expected to be 16-bit
+        Returns:
+                    (numpy array): int16 buffer of the input audio
+        """
+        if isinstance(data, AudioData):
+            if isinstance(data.frame_data, np.ndarray) and \
+                    data.frame_data.dtype == np.int16:
+                return data.frame_data
+            data = data.get_raw_data(convert_width=2)
+        if isinstance(data, np.ndarray):
+            return pcm_to_int16(data)
+        return np.frombuffer(data, dtype=np.int16)
+
+    def stream_start(self, language: str = None,
+                     hotwords: Optional[Dict[str, float]] = None):
+        """
+        Opens a decoding stream so audio can be decoded while it is
+        being captured. Any unfinished stream is discarded.
+
+        Parameters:
+                    language (str): language code associated with audio
+                    hotwords (dict): words to boost for this stream only,
+                        mapped to boost values
+        """
+        if self._stream is not None:
+            LOG.warning("Discarding unfinished stream")
+            self._stream[1].freeStream()
+        # The pooled model is kept with the stream so it is not freed if
+        # evicted before the stream is finished
+        self._stream = self.create_stream(language, hotwords)
+
+    def create_stream(self, language: str = None,
+                      hotwords: Optional[Dict[str, float]] = None) \
+            -> Tuple[PooledModel, object]:
+        """
+        Creates a decoding stream on the shared model for a language. The
+        caller owns the stream and must finish or free it, and must keep a
+        reference to the returned model until then; a stream does not keep
+        its model alive, so a model evicted from the pool would otherwise
+        be freed under it.
+
+        Parameters:
+                    language (str): language code associated with audio
+                    hotwords (dict): words to boost for this stream only,
+                        mapped to boost values
+        Returns:
+                    pooled, stream (tuple): model the stream decodes with
+                        and the new deepspeech.Stream
+        """
+        pooled = self._get_pooled_model(self.resolve_lang(language))
+        with pooled.lock:
+            self._apply_decoder_settings(pooled, hotwords=hotwords)
+            return pooled, pooled.model.createStream()
+
+    def stream_data(self, data: Union[bytes, np.ndarray, AudioData],
+                    partial: bool = True) -> Optional[str]:
+        """
+        Feeds a chunk of audio to the open stream.
+
+        Parameters:
+                    data (bytes, numpy array, AudioData): 16-bit PCM chunk at
+                        the model sample rate
+                    partial (bool): if True, decode and return a partial
+                        transcript of the audio received so far
+        Returns:
+                    text (str): partial transcript if requested, else None
+        """
+        if self._stream is None:
+            raise RuntimeError("stream_start must be called before stream_data")
+        _, stream = self._stream
+        stream.feedAudioContent(self._to_int16(data))
+        if partial:
+            return str(stream.intermediateDecode())
+        return None
+
+    def stream_stop(self) -> Optional[str]:
+        """
+        Finishes the open stream and returns the final transcript.
+        The stream resources are released by the decoder.
+
+        Returns:
+                    text (str): recognized text, None if no stream is open
+        """
+        if self._stream is None:
+            LOG.warning("No stream to stop")
+            return None
+        # `pooled` keeps the model alive until the stream is finished
+        (pooled, stream), self._stream = self._stream, None
+        return str(stream.finishStream())
+
+    def stream_stop_with_metadata(self, num_results: int = 3) -> List[dict]:
+        """
+        Finishes the open stream and returns candidate transcripts with
+        word timings.
+
+        Parameters:
+                    num_results (int): max candidate transcripts to return
+        Returns:
+                    (list): candidates as returned by execute_with_metadata
+        """
+        if self._stream is None:
+            LOG.warning("No stream to stop")
+            return []
+        (pooled, stream), self._stream = self._stream, None
+        return metadata_to_list(stream.finishStreamWithMetadata(num_results))
+
+    def transcribe_batch(self, audio: List[Union[str, AudioData]],
+                         language: str = None) -> List[str]:
+        """
+        Transcribes many utterances in parallel using a pool of worker
+        processes. Workers are started on the first call and reused.
+
+        Parameters:
+                    audio (list): wav file paths and/or AudioData objects
+                    language (str): language code associated with audio
+        Returns:
+                    (list): recognized text in the same order as `audio`
+        """
+        return self.get_batch_transcriber().transcribe(audio, language)
+
+    def get_batch_transcriber(self) -> BatchTranscriber:
+        """
+        Returns the pool of batch worker processes, creating it if needed.
+        """
+        if not self._batch:
+            self._batch = BatchTranscriber(self._config, self.batch_workers)
+        return self._batch
+
+    def transcribe_long(self, audio: Union[str, AudioData],
+                        language: str = None, parallel: bool = True,
+                        min_silence: float = 0.5,
+                        max_segment: float = 30.0) -> Iterator[dict]:
+        """
+        Transcribes long recordings by splitting them at pauses and decoding
+        the segments, in parallel worker processes if `parallel` is True.
+
+        Parameters:
+                    audio (str, AudioData): path to a wav file or AudioData
+                    language (str): language code associated with audio
+                    parallel (bool): decode segments in worker processes
+                    min_silence (float): seconds of silence that end a segment
+                    max_segment (float): max seconds per segment
+        Returns:
+                    (generator): dicts with `start` and `end` in seconds and
+                        `text`, yielded in order as segments are decoded
+        """
+        if isinstance(audio, str):
+            _, audio = self.get_audio_data(audio)
+        else:
+            sample_rate = self._get_pooled_model(
+                self.resolve_lang(language)).model.sampleRate()
+            if audio.sample_rate != sample_rate:
+                audio = AudioData(convert_audio(self._to_int16(audio),
+                                                audio.sample_rate,
+                                                sample_rate),
+                                  sample_rate, 2)
+        return transcribe_long(self, audio, language, parallel,
+                               min_silence, max_segment)
+
+    @property
+    def async_stats(self) -> dict:
+        """
+        Counts of in-flight and queued async requests
+        """
+        return self._async.stats
+
+    async def execute_async(self, audio: AudioData, language: str = None,
+                            hotwords: Optional[Dict[str, float]] = None):
+        """
+        Executes speech recognition without blocking the event loop. Decodes
+        run in worker threads, or in the batch worker processes if
+        `async_processes` is configured. Raises DecoderSaturatedError if
+        `async_max_pending` requests are already pending.
+
+        Parameters:
+                    audio (AudioData): AudioData of the input audio
+                    language (str): language code associated with audio
+                    hotwords (dict): words to boost for this request only,
+                        mapped to boost values
+        Returns:
+                    text (str): recognized text
+        """
+        if self.async_processes:
+            batch = self.get_batch_transcriber()
+            return await self._async.submit(
+                lambda: batch.submit(audio, language, hotwords))
+        return await self._async.run(self.execute, audio, language, None,
+                                     hotwords)
+
+    async def stream_start_async(self, language: str = None,
+                                 hotwords: Optional[Dict[str, float]] = None):
+        """
+        Async version of `stream_start`
+        """
+        return await self._async.run(self.stream_start, language, hotwords)
+
+    async def stream_data_async(self, data: Union[bytes, np.ndarray,
+                                                  AudioData],
+                                partial: bool = True) -> Optional[str]:
+        """
+        Async version of `stream_data`
+        """
+        return await self._async.run(self.stream_data, data, partial)
+
+    async def stream_stop_async(self) -> Optional[str]:
+        """
+        Async version of `stream_stop`
+        """
+        return await self._async.run(self.stream_stop)
+
+    def shutdown_batch(self):
+        """
+        Stops the batch worker processes, if started.
+        """
+        if self._batch:
+            self._batch.shutdown()
+            self._batch = None
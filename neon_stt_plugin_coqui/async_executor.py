@@ -0,0 +1,136 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import cpu_count
+from threading import Lock
+from typing import Callable, Optional, Set
+
+
+class DecoderSaturatedError(RuntimeError):
+    """
+    Raised when a request is rejected because too many are pending.
+    """
+
+
+class AsyncExecutor:
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        """
+        Runs blocking decodes off the event loop with a bound on the number
+        of pending requests. Requests beyond the bound are rejected with
+        DecoderSaturatedError so callers can shed load.
+
+        Parameters:
+                    max_workers (int): decodes run concurrently
+                    max_pending (int): max queued plus running requests,
+                        defaults to 4 * max_workers
+        """
+        self.max_workers = max_workers or cpu_count() or 1
+        self.max_pending = max_pending or 4 * self.max_workers
+        # Submitted work that has not completed, including work whose
+        # waiting task was cancelled after it started
+        self._futures: Set[Future] = set()
+        self._lock = Lock()
+        self._threads: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of requests currently being decoded
+        """
+        with self._lock:
+            return sum(1 for f in self._futures if f.running())
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Number of requests waiting for a free worker
+        """
+        with self._lock:
+            return sum(1 for f in self._futures if not f.running())
+
+    @property
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight,
+                "queue_depth": self.queue_depth,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending}
+
+    def _get_threads(self) -> ThreadPoolExecutor:
+        if not self._threads:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._threads
+
+    async def run(self, func: Callable, *args):
+        """
+        Runs `func(*args)` in a worker thread.
+
+        Parameters:
+                    func (callable): blocking function to run
+                    args: arguments to pass to `func`
+        Returns:
+                    result of `func`
+        """
+        return await self.submit(
+            lambda: self._get_threads().submit(func, *args))
+
+    async def submit(self, submit: Callable[[], Future]):
+        """
+        Submits work to an executor and waits for the result. If the waiting
+        task is cancelled before the work has started, it is removed from the
+        queue; work that already started runs to completion and counts
+        towards `max_pending` until it does.
+
+        Parameters:
+                    submit (callable): submits the work and returns a Future
+        Returns:
+                    result of the submitted work
+        """
+        with self._lock:
+            if len(self._futures) >= self.max_pending:
+                raise DecoderSaturatedError(f"{len(self._futures)} requests "
+                                            f"pending")
+            future = submit()
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def shutdown(self):
+        if self._threads:
+            self._threads.shutdown(wait=False)
+            self._threads = None
@@ -0,0 +1,602 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import io
+import os
+import struct
+from functools import lru_cache
+from math import gcd
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Zero crossings of the sinc on each side of the filter center. More
+# crossings give a sharper cutoff at the cost of compute
+ZERO_CROSSINGS = 16
+# Filter cutoff as a fraction of the lower Nyquist frequency
+ROLLOFF = 0.945
+# Output samples computed per vectorized block, bounds temporary memory
+BLOCK_SIZE = 16384
+# Default `preprocess` options. Levels are in int16 sample units
+PREPROCESSING_DEFAULTS = {
+    'trim_silence': True,  # drop leading/trailing silence
+    'trim_padding': 0.2,  # seconds of silence kept around speech
+    'remove_dc': True,  # subtract the mean sample value
+    'normalize': None,  # `peak`, `rms` or None
+    'target_level': None,  # defaults to NORMALIZE_TARGETS[normalize]
+    'max_gain': 10.0,  # max amplification applied by normalization
+    'noise_gate': None,  # RMS below which frames are muted, None to disable
+    'frame_ms': 30,  # analysis frame length in milliseconds
+    'min_energy': 100.0  # lowest RMS considered speech when trimming
+}
+NORMALIZE_TARGETS = {
+    'peak': 29000.0,  # about -1 dBFS
+    'rms': 3000.0  # about -21 dBFS
+}
+
+
+def downmix(audio: np.ndarray, channels: int) -> np.ndarray:
+    """
+    Averages interleaved multi-channel audio into a single channel.
+
+    Parameters:
+                audio (numpy array): interleaved samples
+                channels (int): number of interleaved channels
+    Returns:
+                (numpy array): float32 mono samples
+    """
+    if channels == 1:
+        return audio.astype(np.float32, copy=False)
+    frames = len(audio) // channels
+    return audio[:frames * channels].reshape(frames, channels)\
+        .mean(axis=1, dtype=np.float32)
+
+
+@lru_cache(maxsize=32)
+def _polyphase_filters(up: int, down: int) -> (np.ndarray, int):
+    """
+    Builds a Kaiser-windowed sinc low-pass filter split into `up` phases.
+
+    Parameters:
+                up (int): upsampling factor
+                down (int): downsampling factor
+    Returns:
+                filters (numpy array): (up, taps) filter for each phase
+                half_taps (int): input samples on each side of the center
+    """
+    # Cutoff in cycles per input sample
+    cutoff = 0.5 * min(1.0, up / down) * ROLLOFF
+    half_taps = int(np.ceil(ZERO_CROSSINGS / (2 * cutoff)))
+    # Offset of each input tap relative to the output position, per phase
+    taps = np.arange(-half_taps + 1, half_taps + 1, dtype=np.float64)
+    phases = np.arange(up, dtype=np.float64) / up
+    x = taps[np.newaxis, :] - phases[:, np.newaxis]
+    window = np.kaiser(2 * half_taps + 1, 8.6)
+    window = np.interp(x, np.arange(-half_taps, half_taps + 1), window)
+    filters = 2 * cutoff * np.sinc(2 * cutoff * x) * window
+    # Normalize each phase to unity DC gain
+    filters /= filters.sum(axis=1, keepdims=True)
+    return filters.astype(np.float32), half_taps
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Resamples mono audio with a polyphase windowed-sinc filter.
+
+    Parameters:
+                audio (numpy array): mono samples
+                orig_sr (int): sample rate of `audio`
+                target_sr (int): desired sample rate
+    Returns:
+                (numpy array): float32 samples at `target_sr`
+    """
+    audio = audio.astype(np.float32, copy=False)
+    if orig_sr == target_sr or not len(audio):
+        return audio
+    g = gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+    filters, half_taps = _polyphase_filters(up, down)
+    padded = np.pad(audio, (half_taps, half_taps))
+    tap_offsets = np.arange(2 * half_taps)
+
+    out_len = int(np.ceil(len(audio) * up / down))
+    output = np.empty(out_len, dtype=np.float32)
+    for start in range(0, out_len, BLOCK_SIZE):
+        n = np.arange(start, min(start + BLOCK_SIZE, out_len))
+        base, phase = np.divmod(n * down, up)
+        # Input sample base + k - half_taps + 1 lands at padded[base + k + 1]
+        window = padded[base[:, np.newaxis] + tap_offsets + 1]
+        output[start:start + len(n)] = \
+            np.einsum('ij,ij->i', window, filters[phase])
+    return output
+
+
+def to_int16(audio: np.ndarray) -> np.ndarray:
+    """
+    Rounds and clips float samples to int16.
+
+    Parameters:
+                audio (numpy array): samples in int16 range
+    Returns:
+                (numpy array): int16 samples
+    """
+    if audio.dtype == np.int16:
+        return audio
+    return np.clip(np.rint(audio), -32768, 32767).astype(np.int16)
+
+
+def convert_audio(audio: np.ndarray, orig_sr: int, target_sr: int,
+                  channels: int = 1) -> np.ndarray:
+    """
+    Downmixes and resamples int16 audio to mono int16 at `target_sr`.
+
+    Parameters:
+                audio (numpy array): interleaved int16 samples
+                orig_sr (int): sample rate of `audio`
+                target_sr (int): desired sample rate
+                channels (int): number of interleaved channels
+    Returns:
+                (numpy array): mono int16 samples at `target_sr`
+    """
+    if channels == 1 and orig_sr == target_sr:
+        return audio.astype(np.int16, copy=False)
+    return to_int16(resample(downmix(audio, channels), orig_sr, target_sr))
+
+
+def pcm_to_int16(audio: np.ndarray) -> np.ndarray:
+    """
+    Converts PCM samples to int16 in a single vectorized pass. int16 input
+    is returned as-is without a copy.
+
+    Parameters:
+                audio (numpy array): uint8, int16, int32 or float samples,
+                    or (n, 3) uint8 bytes of little-endian 24-bit samples
+    Returns:
+                (numpy array): int16 samples
+    """
+    if audio.dtype == np.int16:
+        return audio
+    if audio.dtype == np.uint8 and audio.ndim == 2:
+        # 24-bit; keep the two most significant bytes
+        return (audio[:, 1].astype(np.uint16) |
+                (audio[:, 2].astype(np.uint16) << 8)).view(np.int16)
+    if audio.dtype == np.uint8:
+        return ((audio.astype(np.int16) - 128) << 8).astype(np.int16)
+    if audio.dtype == np.int32:
+        return (audio >> 16).astype(np.int16)
+    if np.issubdtype(audio.dtype, np.floating):
+        return np.clip(np.rint(audio * 32767), -32768, 32767).astype(np.int16)
+    raise ValueError(f"Unsupported sample type: {audio.dtype}")
+
+
+def _sample_dtype(format_tag: int, sample_width: int):
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        if sample_width not in (4, 8):
+            raise ValueError(f"Unsupported float width: {sample_width}")
+        return np.dtype('<f4') if sample_width == 4 else np.dtype('<f8')
+    if format_tag != WAVE_FORMAT_PCM:
+        raise ValueError(f"Unsupported wav format: {format_tag}")
+    if sample_width == 3:
+        return np.dtype(np.uint8)
+    dtypes = {1: np.dtype(np.uint8), 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+    if sample_width not in dtypes:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    return dtypes[sample_width]
+
+
+def _map_samples(path: str, offset: int, size: int, dtype: np.dtype,
+                 sample_width: int) -> np.ndarray:
+    frames = size // sample_width
+    if not frames:
+        return np.zeros(0, dtype=np.int16)
+    if sample_width == 3:
+        return np.memmap(path, dtype=np.uint8, mode='r', offset=offset,
+                         shape=(frames, 3))
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset,
+                     shape=(frames,))
+
+
+def _parse_wav_header(f, name: str) -> Tuple[int, int, int, int, int, int]:
+    """
+    Reads the RIFF header of a wav file up to the start of the samples.
+
+    Parameters:
+                f (file): binary file object positioned at the start
+                name (str): file description for error messages
+    Returns:
+                (tuple): data offset, data size, format tag, channels,
+                    sample rate and sample width
+    """
+    fmt = None
+    riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+    if riff != b'RIFF' or wave_id != b'WAVE':
+        raise ValueError(f"Not a wav file: {name}")
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError(f"No data chunk in {name}")
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            fmt = f.read(chunk_size)
+            f.seek(chunk_size % 2, 1)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError(f"No fmt chunk before data in {name}")
+            data_offset = f.tell()
+            break
+        else:
+            # Chunks are padded to an even size
+            f.seek(chunk_size + chunk_size % 2, 1)
+    f.seek(0, 2)
+    # Some writers leave the data size unset when streaming
+    data_size = min(chunk_size, f.tell() - data_offset)
+
+    format_tag, channels, sample_rate, _, _, bits = \
+        struct.unpack('<HHIIHH', fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE:
+        format_tag = struct.unpack('<H', fmt[24:26])[0]
+    return data_offset, data_size, format_tag, channels, sample_rate, \
+        bits // 8
+
+
+def read_wav(path: str) -> Tuple[np.ndarray, int, int]:
+    """
+    Memory-maps the samples of a wav file. 16-bit files are returned as an
+    int16 view of the file with no copy; other formats are converted to
+    int16 in a single pass.
+
+    Parameters:
+                path (str): path to wav file
+    Returns:
+                audio (numpy array): interleaved int16 samples
+                sample_rate (int): sample rate of the file
+                channels (int): number of interleaved channels
+    """
+    with open(path, 'rb') as f:
+        data_offset, data_size, format_tag, channels, sample_rate, \
+            sample_width = _parse_wav_header(f, path)
+    dtype = _sample_dtype(format_tag, sample_width)
+    samples = _map_samples(path, data_offset, data_size, dtype, sample_width)
+    return pcm_to_int16(samples), sample_rate, channels
+
+
+def parse_wav_bytes(data: bytes) -> Tuple[np.ndarray, int, int]:
+    """
+    Reads the samples of an in-memory wav file, i.e. an upload, as a view
+    of `data` where possible.
+
+    Parameters:
+                data (bytes): wav file contents
+    Returns:
+                audio (numpy array): interleaved int16 samples
+                sample_rate (int): sample rate of the file
+                channels (int): number of interleaved channels
+    """
+    data_offset, data_size, format_tag, channels, sample_rate, \
+        sample_width = _parse_wav_header(io.BytesIO(data), "request body")
+    dtype = _sample_dtype(format_tag, sample_width)
+    frames = data_size // sample_width
+    samples = np.frombuffer(data, dtype=dtype, offset=data_offset,
+                            count=frames * (3 if sample_width == 3 else 1))
+    if sample_width == 3:
+        samples = samples.reshape(frames, 3)
+    return pcm_to_int16(samples), sample_rate, channels
+
+
+def read_pcm(path: str, sample_width: int = 2,
+             is_float: bool = False) -> np.ndarray:
+    """
+    Memory-maps a headerless little-endian PCM file.
+
+    Parameters:
+                path (str): path to raw audio file
+                sample_width (int): bytes per sample
+                is_float (bool): True if samples are IEEE floats
+    Returns:
+                (numpy array): interleaved int16 samples
+    """
+    format_tag = WAVE_FORMAT_IEEE_FLOAT if is_float else WAVE_FORMAT_PCM
+    dtype = _sample_dtype(format_tag, sample_width)
+    size = os.path.getsize(path)
+    return pcm_to_int16(_map_samples(path, 0, size, dtype, sample_width))
+
+
+def frame_energy(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    Computes the RMS energy of consecutive non-overlapping frames. Frames
+    are processed in blocks of BLOCK_SIZE samples so memory-mapped input is
+    never copied whole.
+
+    Parameters:
+                audio (numpy array): mono samples
+                frame_length (int): samples per frame
+    Returns:
+                (numpy array): RMS of each frame; a trailing partial frame
+                    is included, padded with zeros
+    """
+    full_frames = len(audio) // frame_length
+    energy = np.empty(int(np.ceil(len(audio) / frame_length)),
+                      dtype=np.float32)
+    block_frames = max(1, BLOCK_SIZE // frame_length)
+    for start in range(0, full_frames, block_frames):
+        end = min(full_frames, start + block_frames)
+        block = np.asarray(audio[start * frame_length:end * frame_length],
+                           dtype=np.float32).reshape(-1, frame_length)
+        energy[start:end] = np.sqrt(np.mean(block * block, axis=1))
+    if len(energy) > full_frames:
+        tail = np.asarray(audio[full_frames * frame_length:],
+                          dtype=np.float32)
+        energy[-1] = np.sqrt(np.sum(tail * tail) / frame_length)
+    return energy
+
+
+def speech_threshold(energy: np.ndarray, min_energy: float = 100.0,
+                     ratio: float = 3.0) -> float:
+    """
+    Estimates the energy above which a frame is considered speech, as a
+    multiple of the noise floor. The threshold is capped at half the level
+    of the loudest frames so audio with no pauses is still detected.
+
+    Parameters:
+                energy (numpy array): RMS energy per frame
+                min_energy (float): lowest threshold returned
+                ratio (float): threshold relative to the noise floor
+    Returns:
+                (float): energy threshold
+    """
+    if not len(energy):
+        return min_energy
+    noise_floor, speech_level = np.percentile(energy, [10, 90])
+    return max(min_energy, min(ratio * float(noise_floor),
+                               0.5 * float(speech_level)))
+
+
+def split_on_silence(audio: np.ndarray, sample_rate: int,
+                     frame_ms: int = 30, min_silence: float = 0.5,
+                     max_segment: float = 30.0,
+                     min_energy: float = 100.0) -> List[Tuple[int, int]]:
+    """
+    Splits audio into speech segments at pauses, using frame energy relative
+    to the noise floor. Segments longer than `max_segment` are split at the
+    quietest frame.
+
+    Parameters:
+                audio (numpy array): mono samples
+                sample_rate (int): sample rate of `audio`
+                frame_ms (int): analysis frame length in milliseconds
+                min_silence (float): seconds of silence that end a segment
+                max_segment (float): max seconds per segment
+                min_energy (float): lowest RMS considered speech
+    Returns:
+                (list): (start, end) sample indices of each segment
+    """
+    frame_length = max(1, sample_rate * frame_ms // 1000)
+    energy = frame_energy(audio, frame_length)
+    speech = energy > speech_threshold(energy, min_energy)
+    if not speech.any():
+        return []
+
+    # Boundaries of runs of speech/silence frames
+    changes = np.flatnonzero(np.diff(speech.astype(np.int8))) + 1
+    starts = np.concatenate(([0], changes))
+    ends = np.concatenate((changes, [len(speech)]))
+    min_silence_frames = max(1, int(min_silence * 1000 / frame_ms))
+
+    segments = []
+    seg_start = None
+    for start, end in zip(starts, ends):
+        if speech[start]:
+            if seg_start is None:
+                seg_start = start
+        elif seg_start is not None and end - start >= min_silence_frames:
+            # Keep half the pause as padding on the segment end
+            segments.append((seg_start, start + (end - start) // 2))
+            seg_start = None
+    if seg_start is not None:
+        segments.append((seg_start, len(speech)))
+
+    # At least two frames, so every forced cut makes progress
+    max_frames = max(2, int(max_segment * 1000 / frame_ms))
+    split = []
+    while segments:
+        start, end = segments.pop(0)
+        if end - start <= max_frames:
+            split.append((start, end))
+            continue
+        # Cut at the quietest frame in the second half of the allowed span
+        search_start = start + max_frames // 2
+        cut = search_start + int(np.argmin(
+            energy[search_start:start + max_frames]))
+        split.append((start, cut))
+        segments.insert(0, (cut, end))
+
+    # Extend starts back by a frame to keep onsets, convert to samples
+    samples = []
+    prev_end = 0
+    for start, end in split:
+        start = max(prev_end, (int(start) - 1) * frame_length)
+        prev_end = min(len(audio), int(end) * frame_length)
+        samples.append((start, prev_end))
+    return samples
+
+
+def trim_silence(audio: np.ndarray, sample_rate: int, frame_ms: int = 30,
+                 padding: float = 0.2,
+                 min_energy: float = 100.0) -> Tuple[int, int]:
+    """
+    Finds the span between the first and last speech frames, using frame
+    energy relative to the noise floor.
+
+    Parameters:
+                audio (numpy array): mono samples
+                sample_rate (int): sample rate of `audio`
+                frame_ms (int): analysis frame length in milliseconds
+                padding (float): seconds of silence kept on each side
+                min_energy (float): lowest RMS considered speech
+    Returns:
+                (start, end) (tuple): sample indices of the span; all of
+                    `audio` if no speech is found
+    """
+    frame_length = max(1, sample_rate * frame_ms // 1000)
+    energy = frame_energy(audio, frame_length)
+    speech = np.flatnonzero(energy > speech_threshold(energy, min_energy))
+    if not len(speech):
+        return 0, len(audio)
+    pad = int(padding * sample_rate)
+    start = max(0, int(speech[0]) * frame_length - pad)
+    end = min(len(audio), (int(speech[-1]) + 1) * frame_length + pad)
+    return start, end
+
+
+def remove_dc(audio: np.ndarray) -> np.ndarray:
+    """
+    Subtracts the DC offset (mean sample value).
+
+    Parameters:
+                audio (numpy array): mono samples
+    Returns:
+                (numpy array): float32 samples
+    """
+    offset = np.mean(audio, dtype=np.float64) if len(audio) else 0.0
+    return audio.astype(np.float32) - np.float32(offset)
+
+
+def normalize(audio: np.ndarray, mode: str = 'peak',
+              target_level: Optional[float] = None,
+              max_gain: float = 10.0) -> np.ndarray:
+    """
+    Scales audio to a target peak or RMS level. Gain is limited to
+    `max_gain` so silence and noise are not amplified without bound, and
+    RMS normalization never pushes peaks past full scale.
+
+    Parameters:
+                audio (numpy array): mono samples
+                mode (str): `peak` or `rms`
+                target_level (float): target level in int16 units, defaults
+                    to NORMALIZE_TARGETS[mode]
+                max_gain (float): max amplification
+    Returns:
+                (numpy array): float32 samples
+    """
+    if mode not in NORMALIZE_TARGETS:
+        raise ValueError(f"Unknown normalize mode: {mode}")
+    samples = audio.astype(np.float32, copy=False)
+    if not len(samples):
+        return samples
+    peak = float(np.max(np.abs(samples)))
+    if mode == 'peak':
+        level = peak
+    else:
+        level = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    if level <= 0:
+        return samples
+    gain = min((target_level or NORMALIZE_TARGETS[mode]) / level, max_gain,
+               32767.0 / peak)
+    return samples * np.float32(gain)
+
+
+def noise_gate(audio: np.ndarray, sample_rate: int, threshold: float,
+               frame_ms: int = 30) -> np.ndarray:
+    """
+    Mutes frames whose RMS energy is below a threshold.
+
+    Parameters:
+                audio (numpy array): mono samples
+                sample_rate (int): sample rate of `audio`
+                threshold (float): RMS in int16 units below which frames are
+                    muted
+                frame_ms (int): frame length in milliseconds
+    Returns:
+                (numpy array): gated samples
+    """
+    frame_length = max(1, sample_rate * frame_ms // 1000)
+    is_open = frame_energy(audio, frame_length) >= threshold
+    if is_open.all():
+        return audio
+    gain = np.repeat(is_open.astype(audio.dtype), frame_length)[:len(audio)]
+    return audio * gain
+
+
+def preprocessing_options(options: Optional[dict] = None) -> dict:
+    """
+    Merges preprocessing options with PREPROCESSING_DEFAULTS and validates
+    them.
+
+    Parameters:
+                options (dict): options to override
+    Returns:
+                (dict): complete options
+    Raises:
+                ValueError: if an option is unknown or invalid
+    """
+    options = options or {}
+    unknown = set(options) - set(PREPROCESSING_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown preprocessing options: {sorted(unknown)}")
+    options = {**PREPROCESSING_DEFAULTS, **options}
+    if options['normalize'] and options['normalize'] not in NORMALIZE_TARGETS:
+        raise ValueError(f"Unknown normalize mode: {options['normalize']}")
+    return options
+
+
+def preprocess(audio: np.ndarray, sample_rate: int,
+               options: Optional[dict] = None) -> Tuple[np.ndarray, int]:
+    """
+    Prepares mono audio for decoding: removes DC offset, trims leading and
+    trailing silence, applies the noise gate and normalizes, as enabled in
+    `options`. With only trimming enabled the result is a view of `audio`.
+
+    Parameters:
+                audio (numpy array): mono samples
+                sample_rate (int): sample rate of `audio`
+                options (dict): overrides of PREPROCESSING_DEFAULTS
+    Returns:
+                audio, offset (tuple): int16 samples and the index in `audio`
+                    of the first returned sample
+    """
+    options = preprocessing_options(options)
+    if options['remove_dc']:
+        audio = remove_dc(audio)
+    start = 0
+    if options['trim_silence']:
+        start, end = trim_silence(audio, sample_rate, options['frame_ms'],
+                                  options['trim_padding'],
+                                  options['min_energy'])
+        audio = audio[start:end]
+    if options['noise_gate']:
+        audio = noise_gate(audio, sample_rate, options['noise_gate'],
+                           options['frame_ms'])
+    if options['normalize']:
+        audio = normalize(audio, options['normalize'],
+                          options['target_level'], options['max_gain'])
+    return to_int16(audio), start
@@ -0,0 +1,131 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from os import cpu_count
+from typing import Dict, Iterable, List, Optional, Union
+
+from speech_recognition import AudioData
+
+_WORKER_STT = None
+
+
+def _init_worker(config: dict):
+    """
+    Loads a model in a worker process so it is ready before the first task.
+
+    Parameters:
+                config (dict): CoquiSTT config
+    """
+    global _WORKER_STT
+    from neon_stt_plugin_coqui import CoquiSTT
+    _WORKER_STT = CoquiSTT(config)
+
+
+def _transcribe(audio: Union[str, AudioData], language: Optional[str],
+                hotwords: Optional[Dict[str, float]] = None) -> str:
+    """
+    Transcribes one item in a worker process.
+
+    Parameters:
+                audio (str, AudioData): path to a wav file or AudioData
+                language (str): language code associated with audio
+                hotwords (dict): words to boost for this request only
+    Returns:
+                text (str): recognized text
+    """
+    if isinstance(audio, str):
+        _, audio = _WORKER_STT.get_audio_data(audio)
+    return _WORKER_STT.execute(audio, language, hotwords=hotwords)
+
+
+class BatchTranscriber:
+    def __init__(self, config: dict, workers: int = None):
+        """
+        Pool of worker processes, each holding its own preloaded model.
+
+        Parameters:
+                    config (dict): CoquiSTT config used by every worker
+                    workers (int): number of processes, defaults to cpu count
+        """
+        # Workers must not set up their own metrics sinks; a Prometheus sink
+        # would try to bind the parent's port in every process. Models are
+        # loaded by the initializer, not in the background
+        self.config = {k: v for k, v in config.items()
+                       if k not in ('metrics', 'lazy_load')}
+        self.workers = workers or cpu_count() or 1
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if not self._executor:
+            # Spawned workers start without the parent's model pool, so each
+            # loads its own model and cannot inherit a lock held at fork time
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(self.config,))
+        return self._executor
+
+    def transcribe(self, audio: Iterable[Union[str, AudioData]],
+                   language: str = None) -> List[str]:
+        """
+        Transcribes audio in parallel across the worker processes.
+
+        Parameters:
+                    audio (list): wav file paths and/or AudioData objects
+                    language (str): language code associated with audio
+        Returns:
+                    (list): recognized text in the same order as `audio`
+        """
+        audio = list(audio)
+        chunksize = max(1, len(audio) // (self.workers * 4))
+        return list(self._get_executor().map(_transcribe, audio,
+                                             [language] * len(audio),
+                                             chunksize=chunksize))
+
+    def submit(self, audio: Union[str, AudioData], language: str = None,
+               hotwords: Optional[Dict[str, float]] = None) -> Future:
+        """
+        Queues one item for transcription by a worker process.
+
+        Parameters:
+                    audio (str, AudioData): path to a wav file or AudioData
+                    language (str): language code associated with audio
+                    hotwords (dict): words to boost for this request only
+        Returns:
+                    (Future): resolves to the recognized text
+        """
+        return self._get_executor().submit(_transcribe, audio, language,
+                                           hotwords)
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,320 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import monotonic
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from neon_stt_plugin_coqui import CoquiSTT
+from neon_stt_plugin_coqui.batch import BatchTranscriber
+from neon_stt_plugin_coqui.model_pool import MODEL_POOL
+
+# Metrics where a higher value is a regression, with the allowed change:
+# relative for timings, absolute for error rates
+REGRESSION_CHECKS = {
+    "latency_p50": ("relative", None),
+    "latency_p95": ("relative", None),
+    "real_time_factor": ("relative", None),
+    "peak_rss_mb": ("relative", None),
+    "worker_peak_rss_mb": ("relative", None),
+    "cer": ("absolute", 0.01)
+}
+
+
+def edit_distance(reference: str, hypothesis: str) -> int:
+    """
+    Levenshtein distance between two strings.
+    """
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_char in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_char != hyp_char)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(references: List[str],
+                         hypotheses: List[str]) -> float:
+    """
+    Character error rate over a set of transcripts.
+    """
+    errors = sum(edit_distance(r, h) for r, h in zip(references, hypotheses))
+    return errors / max(1, sum(len(r) for r in references))
+
+
+def find_test_files(audio_dir: str, lang: str) -> List[Tuple[str, str]]:
+    """
+    Finds wav files under `audio_dir/lang`. The expected transcript is the
+    file name with underscores as spaces, as in tests/test_audio.
+
+    Returns:
+                (list): (path, transcript) tuples
+    """
+    files = []
+    for root, _, names in os.walk(os.path.join(audio_dir, lang)):
+        for name in sorted(names):
+            if name.endswith('.wav'):
+                files.append((os.path.join(root, name),
+                              ' '.join(name[:-4].split('_')).lower()))
+    return files
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """
+    Peak resident memory in MiB of this process, or with RUSAGE_CHILDREN of
+    the largest finished child process. The peak covers the process
+    lifetime, so configurations are measured in separate processes.
+    """
+    usage = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return usage / divisor
+
+
+def measure_cold_start(config: dict) -> Tuple[float, CoquiSTT]:
+    """
+    Times plugin construction with the model not yet loaded in the pool.
+    Includes any model download.
+    """
+    MODEL_POOL.evict(config['lang'])
+    start = monotonic()
+    stt = CoquiSTT(config)
+    return monotonic() - start, stt
+
+
+def run_decodes(stt: CoquiSTT, config: dict, audio: list,
+                concurrency: int, repeat: int) -> Tuple[List[float], List[str],
+                                                       float]:
+    """
+    Decodes every item `repeat` times with `concurrency` clients, each
+    waiting for its previous result before sending the next request.
+    Concurrent decodes run in worker processes.
+
+    Returns:
+                latencies (list): seconds per request
+                texts (list): transcripts of the first repetition, in order
+                wall_time (float): total seconds for all requests
+    """
+    requests = [a for _ in range(repeat) for a in audio]
+    if concurrency == 1:
+        def _decode(audio_data):
+            start = monotonic()
+            text = stt.execute(audio_data)
+            return monotonic() - start, text
+        batch = None
+    else:
+        batch = BatchTranscriber(config, concurrency)
+        # Start workers and load models before timing
+        batch.transcribe(audio[:concurrency])
+
+        def _decode(audio_data):
+            start = monotonic()
+            text = batch.submit(audio_data).result()
+            return monotonic() - start, text
+    try:
+        _decode(audio[0])
+        start = monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as clients:
+            results = list(clients.map(_decode, requests))
+        wall_time = monotonic() - start
+    finally:
+        if batch:
+            batch.shutdown()
+    latencies = [r[0] for r in results]
+    texts = [r[1] for r in results[:len(audio)]]
+    return latencies, texts, wall_time
+
+
+def run_configuration(lang: str, beam_width: int, concurrency: int,
+                      paths: List[str], repeat: int) \
+        -> Tuple[List[float], List[str], float, float, float]:
+    """
+    Loads a model and decodes the files at one beam width and concurrency.
+    Runs in a fresh process so the peak resident memory covers only this
+    configuration.
+
+    Returns:
+                latencies, texts, wall_time: as returned by run_decodes
+                peak_rss_mb (float): peak MiB of the decoding process
+                worker_peak_rss_mb (float): peak MiB of the largest batch
+                    worker process, 0 without workers
+    """
+    config = {'lang': lang, 'beam_width': beam_width}
+    stt = CoquiSTT(config)
+    audio = [stt.get_audio_data(path)[1] for path in paths]
+    latencies, texts, wall_time = \
+        run_decodes(stt, config, audio, concurrency, repeat)
+    # Batch workers have exited by now, so their peak is included
+    return latencies, texts, wall_time, peak_rss_mb(), \
+        peak_rss_mb(resource.RUSAGE_CHILDREN)
+
+
+def benchmark_language(lang: str, audio_dir: str, beam_widths: List[int],
+                       concurrency_levels: List[int],
+                       repeat: int) -> List[dict]:
+    """
+    Runs the benchmark for one language at each beam width and concurrency.
+    """
+    files = find_test_files(audio_dir, lang)
+    if not files:
+        raise FileNotFoundError(f"No wav files for {lang} in {audio_dir}")
+    cold_start, stt = measure_cold_start({'lang': lang})
+    audio = [stt.get_audio_data(path)[1] for path, _ in files]
+    references = [transcript for _, transcript in files]
+    audio_seconds = sum(len(stt._to_int16(a)) / a.sample_rate
+                        for a in audio)
+    cores = os.cpu_count() or 1
+
+    paths = [path for path, _ in files]
+    spawn = multiprocessing.get_context('spawn')
+
+    results = []
+    for beam_width in beam_widths:
+        for concurrency in concurrency_levels:
+            with ProcessPoolExecutor(max_workers=1,
+                                     mp_context=spawn) as process:
+                latencies, texts, wall_time, rss, worker_rss = \
+                    process.submit(run_configuration, lang, beam_width,
+                                   concurrency, paths, repeat).result()
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            total_audio = audio_seconds * repeat
+            results.append({
+                "lang": lang,
+                "beam_width": beam_width,
+                "concurrency": concurrency,
+                "files": len(files),
+                "audio_seconds": round(audio_seconds, 3),
+                "cold_start_seconds": round(cold_start, 3),
+                "latency_p50": round(float(p50), 4),
+                "latency_p95": round(float(p95), 4),
+                "latency_p99": round(float(p99), 4),
+                "real_time_factor": round(sum(latencies) / total_audio, 4),
+                "throughput_per_core": round(
+                    total_audio / wall_time / min(concurrency, cores), 4),
+                "peak_rss_mb": round(rss, 1),
+                "worker_peak_rss_mb": round(worker_rss, 1),
+                "cer": round(character_error_rate(references, texts), 4)
+            })
+    return results
+
+
+def result_key(result: dict) -> Tuple[str, int, int]:
+    return result["lang"], result["beam_width"], result["concurrency"]
+
+
+def compare_to_baseline(results: List[dict], baseline: List[dict],
+                        tolerance: float) -> List[str]:
+    """
+    Compares results with a baseline run.
+
+    Parameters:
+                results (list): results of this run
+                baseline (list): results of a previous run
+                tolerance (float): allowed relative increase in timings
+    Returns:
+                (list): descriptions of regressions, empty if none
+    """
+    baseline: Dict[tuple, dict] = {result_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if not previous:
+            continue
+        for metric, (kind, allowed) in REGRESSION_CHECKS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            limit = old * (1 + tolerance) if kind == "relative" \
+                else old + allowed
+            if new > limit:
+                regressions.append(f"{result_key(result)} {metric}: "
+                                   f"{old} -> {new}")
+    return regressions
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark latency, real-time factor and CER of the "
+                    "Coqui STT plugin")
+    parser.add_argument("--audio-dir", required=True,
+                        help="directory of <lang>/**/<transcript>.wav files")
+    parser.add_argument("--lang", nargs="+", default=["en"])
+    parser.add_argument("--beam-width", nargs="+", type=int, default=[500])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1])
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="times to decode each file")
+    parser.add_argument("--output", help="path to write JSON results")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed relative increase in timings")
+    parsed = parser.parse_args(args)
+
+    results = []
+    for lang in parsed.lang:
+        results.extend(benchmark_language(lang, parsed.audio_dir,
+                                          parsed.beam_width,
+                                          parsed.concurrency, parsed.repeat))
+    report = {
+        "environment": {"python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "processor": platform.processor(),
+                        "cpu_count": os.cpu_count()},
+        "results": results
+    }
+    output = json.dumps(report, indent=2)
+    if parsed.output:
+        with open(parsed.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if parsed.baseline:
+        with open(parsed.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_to_baseline(results, baseline,
+                                          parsed.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
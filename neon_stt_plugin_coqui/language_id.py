@@ -0,0 +1,110 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from time import monotonic
+from typing import Dict, List
+
+import numpy as np
+
+from neon_utils.logger import LOG
+
+from neon_stt_plugin_coqui.audio_utils import convert_audio
+
+# Seconds of audio fed to a probe stream at a time
+PROBE_CHUNK_SECONDS = 0.5
+
+
+def probe_language(stt, lang: str, audio: np.ndarray, sample_rate: int,
+                   beam_width: int, budget: float) -> float:
+    """
+    Decodes the start of an utterance with one language model and scores
+    how well it fits. Audio is fed in chunks and feeding stops early once
+    `budget` seconds have been spent.
+
+    Parameters:
+                stt (CoquiSTT): plugin instance
+                lang (str): language to probe
+                audio (numpy array): int16 audio at `sample_rate`
+                sample_rate (int): sample rate of `audio`
+                beam_width (int): beam width for the probe decode
+                budget (float): max seconds to spend on this probe
+    Returns:
+                (float): candidate confidence per second of audio decoded,
+                    -inf if nothing was recognized
+    """
+    start = monotonic()
+    pooled = stt._get_pooled_model(lang)
+    with pooled.lock:
+        stt._apply_decoder_settings(pooled, beam_width)
+        stream = pooled.model.createStream()
+    chunk = int(sample_rate * PROBE_CHUNK_SECONDS)
+    fed = 0
+    while fed < len(audio) and monotonic() - start < budget:
+        stream.feedAudioContent(audio[fed:fed + chunk])
+        fed += chunk
+    fed = min(fed, len(audio))
+    metadata = stream.finishStreamWithMetadata(1)
+    if not fed or not metadata.transcripts or \
+            not metadata.transcripts[0].tokens:
+        return float('-inf')
+    return metadata.transcripts[0].confidence / (fed / sample_rate)
+
+
+def detect_language(stt, audio: np.ndarray, sample_rate: int,
+                    candidates: List[str], probe_seconds: float = 3.0,
+                    beam_width: int = 50, budget: float = 0.5) -> str:
+    """
+    Picks the candidate language whose model decodes the leading seconds of
+    audio with the highest confidence. The probed audio is resampled to
+    each candidate's manifest sample rate.
+
+    Parameters:
+                stt (CoquiSTT): plugin instance
+                audio (numpy array): int16 audio at `sample_rate`
+                sample_rate (int): sample rate of `audio`
+                candidates (list): model languages to try
+                probe_seconds (float): seconds of leading audio to decode
+                beam_width (int): beam width for probe decodes
+                budget (float): max seconds to spend per candidate
+    Returns:
+                (str): best matching language
+    """
+    audio = audio[:int(probe_seconds * sample_rate)]
+    resampled = {sample_rate: audio}
+    scores: Dict[str, float] = dict()
+    for lang in candidates:
+        model_rate = stt.manifest[lang].sample_rate
+        if model_rate not in resampled:
+            resampled[model_rate] = convert_audio(audio, sample_rate,
+                                                  model_rate)
+        scores[lang] = probe_language(stt, lang, resampled[model_rate],
+                                      model_rate, beam_width, budget)
+    best = max(scores, key=scores.get)
+    LOG.debug(f"Language scores: {scores}")
+    return best
@@ -0,0 +1,86 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from collections import deque
+from typing import Iterator
+
+from speech_recognition import AudioData
+
+from neon_stt_plugin_coqui.audio_utils import split_on_silence
+
+
+def transcribe_long(stt, audio: AudioData, language: str = None,
+                    parallel: bool = True, min_silence: float = 0.5,
+                    max_segment: float = 30.0) -> Iterator[dict]:
+    """
+    Splits audio at pauses and transcribes each segment. Segments are
+    decoded in the batch worker processes when `parallel` is True, with a
+    bounded number in flight so memory use does not grow with input length.
+
+    Parameters:
+                stt (CoquiSTT): plugin instance
+                audio (AudioData): mono 16-bit audio at the model sample rate
+                language (str): language code associated with audio
+                parallel (bool): decode segments in worker processes
+                min_silence (float): seconds of silence that end a segment
+                max_segment (float): max seconds per segment
+    Returns:
+                (generator): dicts with `start` and `end` in seconds and
+                    `text`, in audio order
+    """
+    samples = stt._to_int16(audio)
+    sample_rate = audio.sample_rate
+    segments = split_on_silence(samples, sample_rate,
+                                min_silence=min_silence,
+                                max_segment=max_segment)
+
+    def _result(start, end, text):
+        return {"start": start / sample_rate, "end": end / sample_rate,
+                "text": text}
+
+    if not parallel:
+        for start, end in segments:
+            text = stt.execute(AudioData(samples[start:end], sample_rate, 2),
+                               language)
+            yield _result(start, end, text)
+        return
+
+    batch = stt.get_batch_transcriber()
+    pending = deque()
+    max_pending = batch.workers * 2
+    for start, end in segments:
+        # Copy so a memory-mapped source is not pickled as a whole
+        segment = AudioData(samples[start:end].copy(), sample_rate, 2)
+        pending.append((start, end, batch.submit(segment, language)))
+        if len(pending) >= max_pending:
+            start, end, future = pending.popleft()
+            yield _result(start, end, future.result())
+    while pending:
+        start, end, future = pending.popleft()
+        yield _result(start, end, future.result())
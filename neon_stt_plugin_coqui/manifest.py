@@ -0,0 +1,330 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+import argparse
+import os
+import sys
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from neon_utils.logger import LOG
+
+from neon_stt_plugin_coqui.model_cache import DEFAULT_CACHE_DIR, \
+    download_file, file_sha256, model_paths, verify_file
+
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'coqui_models.yml')
+
+
+class ModelInfo(NamedTuple):
+    """
+    Validated manifest entry for one language
+    """
+    lang: str
+    version: str
+    model_url: str
+    model_sha256: Optional[str] = None
+    model_size: Optional[int] = None
+    scorer_url: Optional[str] = None
+    scorer_sha256: Optional[str] = None
+    scorer_size: Optional[int] = None
+    sample_rate: int = 16000
+    beam_width: Optional[int] = None
+    lm_alpha: Optional[float] = None
+    lm_beta: Optional[float] = None
+
+    @property
+    def alpha_beta(self) -> Optional[Tuple[float, float]]:
+        """
+        Default scorer (alpha, beta), None to use the scorer's own values
+        """
+        if self.lm_alpha is None:
+            return None
+        return self.lm_alpha, self.lm_beta
+
+
+def _check_positive_int(lang: str, key: str, value) -> Optional[int]:
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+        raise ValueError(f"{lang}: {key} must be a positive integer, "
+                         f"got {value!r}")
+    return value
+
+
+def _check_sha256(lang: str, key: str, value) -> Optional[str]:
+    if not value:
+        return None
+    value = str(value).lower()
+    if len(value) != 64 or any(c not in "0123456789abcdef" for c in value):
+        raise ValueError(f"{lang}: {key} is not a sha256 hex digest")
+    return value
+
+
+def parse_entry(lang: str, entry: dict) -> ModelInfo:
+    """
+    Validates a manifest entry.
+
+    Parameters:
+                lang (str): language code of the entry
+                entry (dict): parsed entry from the manifest file
+    Returns:
+                (ModelInfo): validated entry
+    Raises:
+                ValueError: if the entry is incomplete or malformed
+    """
+    unknown = set(entry) - set(ModelInfo._fields)
+    if unknown:
+        raise ValueError(f"{lang}: unknown keys {sorted(unknown)}")
+    if not entry.get('model_url'):
+        raise ValueError(f"{lang}: model_url is required")
+    if not entry.get('version'):
+        raise ValueError(f"{lang}: version is required")
+    if (entry.get('lm_alpha') is None) != (entry.get('lm_beta') is None):
+        raise ValueError(f"{lang}: lm_alpha and lm_beta must be set together")
+    lm_alpha, lm_beta = entry.get('lm_alpha'), entry.get('lm_beta')
+    return ModelInfo(
+        lang=lang,
+        version=str(entry['version']),
+        model_url=entry['model_url'].strip(),
+        model_sha256=_check_sha256(lang, 'model_sha256',
+                                   entry.get('model_sha256')),
+        model_size=_check_positive_int(lang, 'model_size',
+                                       entry.get('model_size')),
+        scorer_url=(entry.get('scorer_url') or '').strip() or None,
+        scorer_sha256=_check_sha256(lang, 'scorer_sha256',
+                                    entry.get('scorer_sha256')),
+        scorer_size=_check_positive_int(lang, 'scorer_size',
+                                        entry.get('scorer_size')),
+        sample_rate=_check_positive_int(lang, 'sample_rate',
+                                        entry.get('sample_rate')) or 16000,
+        beam_width=_check_positive_int(lang, 'beam_width',
+                                       entry.get('beam_width')),
+        lm_alpha=None if lm_alpha is None else float(lm_alpha),
+        lm_beta=None if lm_beta is None else float(lm_beta))
+
+
+class ModelManifest:
+    """
+    Lookup structure built once from a manifest file. Language codes are
+    indexed by their exact, lower-case and short (`en` for `en-us`) forms.
+    """
+    def __init__(self, models: Dict[str, ModelInfo]):
+        self.models = models
+        self._index = {lang.lower(): lang for lang in models}
+        for lang in models:
+            self._index.setdefault(lang.split('-')[0].lower(), lang)
+
+    def __contains__(self, lang: str) -> bool:
+        return lang in self.models
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.models)
+
+    def __getitem__(self, lang: str) -> ModelInfo:
+        return self.models[lang]
+
+    def resolve(self, language: str) -> Optional[str]:
+        """
+        Maps a requested language code onto a manifest language.
+
+        Parameters:
+                    language (str): language code, i.e. `en` or `en-us`
+        Returns:
+                    lang (str): manifest key, None if not supported
+        """
+        if language in self.models:
+            return language
+        return self._index.get(language.lower()) or \
+            self._index.get(language.split('-')[0].lower())
+
+    def get(self, language: str) -> ModelInfo:
+        """
+        Returns the entry for a requested language code.
+
+        Parameters:
+                    language (str): language code, i.e. `en` or `en-us`
+        Returns:
+                    (ModelInfo): manifest entry
+        Raises:
+                    RuntimeError: if the language is not supported
+        """
+        lang = self.resolve(language)
+        if not lang:
+            raise RuntimeError(f"{language} is not supported")
+        return self.models[lang]
+
+
+def _read_manifest(path: str) -> dict:
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=loader) or {}
+
+
+@lru_cache()
+def load_manifest(path: str = None) -> ModelManifest:
+    """
+    Parses and validates a model manifest. Each file is only read once per
+    process.
+
+    Parameters:
+                path (str): manifest file, defaults to the bundled one
+    Returns:
+                (ModelManifest): validated manifest
+    Raises:
+                ValueError: if an entry is malformed
+    """
+    path = os.path.expanduser(path or DEFAULT_MANIFEST)
+    models = {lang: parse_entry(lang, entry or {})
+              for lang, entry in _read_manifest(path).items()}
+    return ModelManifest(models)
+
+
+def _fetch_file(url: str, path: str, sha256: Optional[str],
+                size: Optional[int]):
+    """
+    Downloads a file if missing and verifies it. Files that were already
+    present are verified too, since `download_file` trusts them.
+    """
+    existed = os.path.isfile(path)
+    download_file(url, path, sha256, size)
+    if existed:
+        verify_file(path, sha256, size)
+
+
+def prefetch(info: ModelInfo, cache_dir: str = DEFAULT_CACHE_DIR) \
+        -> Dict[str, str]:
+    """
+    Downloads and verifies the model and scorer for a manifest entry.
+
+    Parameters:
+                info (ModelInfo): manifest entry
+                cache_dir (str): directory to download to
+    Returns:
+                (dict): `model` and `scorer` mapped to their file paths
+    Raises:
+                ValueError: if a file does not match the manifest
+    """
+    model_path, scorer_path = model_paths(info.lang, cache_dir)
+    _fetch_file(info.model_url, model_path, info.model_sha256,
+                info.model_size)
+    paths = {"model": model_path}
+    if info.scorer_url:
+        _fetch_file(info.scorer_url, scorer_path, info.scorer_sha256,
+                    info.scorer_size)
+        paths["scorer"] = scorer_path
+    return paths
+
+
+def record_checksums(path: str, files: Dict[str, Dict[str, str]]) -> int:
+    """
+    Writes the sha256 and size of downloaded files into a manifest where
+    they are not yet recorded. Leading comments are kept.
+
+    Parameters:
+                path (str): manifest file to update
+                files (dict): languages mapped to `prefetch` results
+    Returns:
+                (int): number of values recorded
+    """
+    import yaml
+    with open(path, 'r') as f:
+        header = []
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                break
+            header.append(line)
+    raw = _read_manifest(path)
+    recorded = 0
+    for lang, paths in files.items():
+        for kind, file_path in paths.items():
+            for key, value in ((f"{kind}_sha256", file_sha256(file_path)),
+                               (f"{kind}_size",
+                                os.path.getsize(file_path))):
+                if raw[lang].get(key) is None:
+                    raw[lang][key] = value
+                    recorded += 1
+    with open(path, 'w') as f:
+        f.writelines(header)
+        yaml.safe_dump(raw, f, sort_keys=False, default_flow_style=False)
+    load_manifest.cache_clear()
+    return recorded
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description="Pre-fetch and verify Coqui models, i.e. while building "
+                    "a container image")
+    parser.add_argument("lang", nargs="*",
+                        help="languages to fetch, `all` for every language")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST,
+                        help="model manifest file")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="directory to download models to")
+    parser.add_argument("--record", action="store_true",
+                        help="write unknown sha256 and size values of "
+                             "verified files into the manifest")
+    parser.add_argument("--list", action="store_true",
+                        help="list available languages and exit")
+    parsed = parser.parse_args(args)
+
+    manifest = load_manifest(parsed.manifest)
+    if parsed.list:
+        for lang in manifest:
+            info = manifest[lang]
+            print(f"{lang}\t{info.version}\t"
+                  f"{'scorer' if info.scorer_url else 'no scorer'}")
+        return
+    if not parsed.lang:
+        parser.error("no languages given")
+
+    langs = list(manifest) if parsed.lang == ["all"] else parsed.lang
+    fetched = {}
+    failed = []
+    for language in langs:
+        try:
+            info = manifest.get(language)
+            fetched[info.lang] = prefetch(info,
+                                          os.path.expanduser(parsed.cache_dir))
+            print(f"{info.lang} {info.version}: ok")
+        except Exception as e:
+            LOG.error(f"Failed to fetch {language}: {e}")
+            print(f"{language}: {e}", file=sys.stderr)
+            failed.append(language)
+    if parsed.record and fetched:
+        recorded = record_checksums(parsed.manifest, fetched)
+        print(f"Recorded {recorded} values in {parsed.manifest}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
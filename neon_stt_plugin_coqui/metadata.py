@@ -0,0 +1,87 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from typing import List
+
+# Seconds of audio per decoder timestep
+FRAME_DURATION = 0.02
+
+
+def tokens_to_words(tokens, time_offset: float = 0.0) -> List[dict]:
+    """
+    Groups character tokens of a candidate transcript into words.
+
+    Parameters:
+                tokens: deepspeech TokenMetadata list
+                time_offset (float): seconds added to every timing
+    Returns:
+                (list): dicts with `word`, `start_time` and `end_time` in
+                    seconds
+    """
+    words = []
+    chars = []
+    start = end = 0.0
+    for token in tokens:
+        if token.text == " ":
+            if chars:
+                words.append({"word": "".join(chars),
+                              "start_time": start + time_offset,
+                              "end_time": token.start_time + time_offset})
+                chars = []
+            continue
+        if not chars:
+            start = token.start_time
+        chars.append(token.text)
+        end = token.start_time + FRAME_DURATION
+    if chars:
+        words.append({"word": "".join(chars),
+                      "start_time": start + time_offset,
+                      "end_time": end + time_offset})
+    return words
+
+
+def metadata_to_list(metadata, time_offset: float = 0.0) -> List[dict]:
+    """
+    Converts decoder metadata to serializable transcripts.
+
+    Parameters:
+                metadata: deepspeech Metadata
+                time_offset (float): seconds added to every word timing, i.e.
+                    the length of trimmed leading audio
+    Returns:
+                (list): dicts with `transcript`, `confidence` and `words`,
+                    best candidate first
+    """
+    results = []
+    for candidate in metadata.transcripts:
+        words = tokens_to_words(candidate.tokens, time_offset)
+        results.append({"transcript": " ".join(w["word"] for w in words),
+                        "confidence": candidate.confidence,
+                        "words": words})
+    return results
@@ -0,0 +1,267 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import cProfile
+import io
+import pstats
+import random
+import socket
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+from neon_utils.logger import LOG
+
+METRIC_PREFIX = "coqui_stt_"
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsSink:
+    """
+    Receives plugin metrics. The base class discards them.
+    """
+    def increment(self, name: str, value: float = 1,
+                  tags: Optional[Dict[str, str]] = None):
+        """
+        Adds `value` to a counter.
+        """
+
+    def observe(self, name: str, value: float,
+                tags: Optional[Dict[str, str]] = None):
+        """
+        Records one measurement, i.e. a duration in seconds.
+        """
+
+
+class PrometheusSink(MetricsSink):
+    def __init__(self):
+        """
+        Aggregates metrics in memory and renders them in the Prometheus text
+        exposition format. Measurements are exported as summaries with
+        `_count` and `_sum` series.
+        """
+        self._lock = Lock()
+        self._counters: Dict[Tuple[str, tuple], float] = dict()
+        self._summaries: Dict[Tuple[str, tuple], list] = dict()
+        self._server = None
+
+    @staticmethod
+    def _key(name: str, tags: Optional[Dict[str, str]]):
+        return METRIC_PREFIX + name, tuple(sorted((tags or {}).items()))
+
+    def increment(self, name, value=1, tags=None):
+        key = self._key(name, tags)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, tags=None):
+        key = self._key(name, tags)
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    @staticmethod
+    def _labels(tags: tuple) -> str:
+        if not tags:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in tags) + "}"
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text format.
+        """
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self._counters}):
+                lines.append(f"# TYPE {name}_total counter")
+                for (n, tags), value in sorted(self._counters.items()):
+                    if n == name:
+                        lines.append(f"{name}_total{self._labels(tags)} "
+                                     f"{value}")
+            for name in sorted({n for n, _ in self._summaries}):
+                lines.append(f"# TYPE {name} summary")
+                for (n, tags), (count, total) in \
+                        sorted(self._summaries.items()):
+                    if n == name:
+                        labels = self._labels(tags)
+                        lines.append(f"{name}_count{labels} {count}")
+                        lines.append(f"{name}_sum{labels} {total}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """
+        Serves metrics over HTTP at `/metrics` in a background thread.
+
+        Parameters:
+                    port (int): port to listen on
+                    host (str): address to bind
+        """
+        sink = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sink.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type",
+                                 "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _ThreadingHTTPServer((host, port), _Handler)
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        LOG.info(f"Serving metrics on {host}:{port}/metrics")
+
+
+class StatsDSink(MetricsSink):
+    def __init__(self, host: str = "127.0.0.1", port: int = 8125):
+        """
+        Sends metrics to a StatsD server over UDP. Tags use the DogStatsD
+        `|#key:value` extension. Measurements are sent as timers in
+        milliseconds.
+        """
+        self._address = (host, port)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(self, name: str, value: str, kind: str,
+              tags: Optional[Dict[str, str]]):
+        message = f"{METRIC_PREFIX}{name}:{value}|{kind}"
+        if tags:
+            message += "|#" + ",".join(f"{k}:{v}" for k, v in tags.items())
+        try:
+            self._socket.sendto(message.encode(), self._address)
+        except OSError as e:
+            LOG.debug(f"Failed to send metric: {e}")
+
+    def increment(self, name, value=1, tags=None):
+        self._send(name, f"{value:g}", "c", tags)
+
+    def observe(self, name, value, tags=None):
+        self._send(name, f"{value * 1000:.3f}", "ms", tags)
+
+
+_sink = MetricsSink()
+# Config the current sink was created from, see `configure_metrics`
+_sink_config: Optional[dict] = None
+
+
+def get_metrics_sink() -> MetricsSink:
+    return _sink
+
+
+def set_metrics_sink(sink: MetricsSink):
+    """
+    Sets the process-wide sink that receives plugin metrics.
+    """
+    global _sink, _sink_config
+    _sink = sink
+    _sink_config = None
+
+
+def configure_metrics(config: dict):
+    """
+    Sets up the metrics sink from plugin config. The sink is process-wide,
+    so calls with the config it was already created from keep the existing
+    sink and its accumulated metrics.
+
+    Parameters:
+                config (dict): `sink` (`prometheus` or `statsd`) with
+                    `prometheus_port` or `statsd_host`/`statsd_port`
+    """
+    global _sink_config
+    if config == _sink_config:
+        return
+    sink = config.get("sink")
+    if sink == "prometheus":
+        prometheus = PrometheusSink()
+        if config.get("prometheus_port"):
+            prometheus.serve(int(config["prometheus_port"]))
+        set_metrics_sink(prometheus)
+    elif sink == "statsd":
+        set_metrics_sink(StatsDSink(config.get("statsd_host") or "127.0.0.1",
+                                    int(config.get("statsd_port") or 8125)))
+    elif sink:
+        raise ValueError(f"Unknown metrics sink: {sink}")
+    _sink_config = dict(config)
+
+
+@contextmanager
+def timed(name: str, tags: Optional[Dict[str, str]] = None):
+    """
+    Records the duration of the enclosed block in seconds.
+    """
+    start = monotonic()
+    try:
+        yield
+    finally:
+        _sink.observe(name, monotonic() - start, tags)
+
+
+@contextmanager
+def sample_profile(rate: float, label: str = "", limit: int = 25):
+    """
+    Profiles the enclosed block with cProfile for a random `rate` fraction
+    of calls and logs the most expensive functions.
+
+    Parameters:
+                rate (float): fraction of calls to profile, 0 to disable
+                label (str): description included in the log
+                limit (int): number of functions to log
+    """
+    if not rate or random.random() >= rate:
+        yield
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is active, i.e. a concurrent sampled call
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.disable()
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats("cumulative")\
+            .print_stats(limit)
+        LOG.info(f"Profile {label}:\n{output.getvalue()}")
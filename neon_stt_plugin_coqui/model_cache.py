@@ -0,0 +1,233 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from neon_utils.logger import LOG
+
+from neon_stt_plugin_coqui.metrics import get_metrics_sink, timed
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.local/share/neon")
+CHUNK_SIZE = 1024 * 1024
+
+
+@contextmanager
+def _file_lock(lock_path: str):
+    """
+    Holds an exclusive lock on `lock_path` so only one process downloads a
+    given file at a time.
+    """
+    with open(lock_path, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def file_sha256(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    Computes the sha256 of a file without reading it into memory at once.
+
+    Parameters:
+                path (str): path to file
+                chunk_size (int): bytes to read at a time
+    Returns:
+                (str): hex digest
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def verify_file(path: str, sha256: Optional[str] = None,
+                size: Optional[int] = None, chunk_size: int = CHUNK_SIZE):
+    """
+    Checks a file against its expected size and sha256. The size is checked
+    first since it does not require reading the file.
+
+    Parameters:
+                path (str): path to file
+                sha256 (str): expected hex digest, None to skip
+                size (int): expected size in bytes, None to skip
+                chunk_size (int): bytes to read at a time
+    Raises:
+                ValueError: if the file does not match
+    """
+    if size is not None:
+        actual = os.path.getsize(path)
+        if actual != size:
+            raise ValueError(f"Size mismatch for {path}: "
+                             f"expected {size}, got {actual}")
+    if sha256:
+        actual = file_sha256(path, chunk_size)
+        if actual != sha256.lower():
+            raise ValueError(f"Checksum mismatch for {path}: "
+                             f"expected {sha256}, got {actual}")
+
+
+def model_paths(lang: str, cache_dir: str = DEFAULT_CACHE_DIR) \
+        -> Tuple[str, str]:
+    """
+    Returns the cache paths of the model and scorer files for a language.
+
+    Parameters:
+                lang (str): language code
+                cache_dir (str): directory models are downloaded to
+    Returns:
+                model_path, scorer_path (tuple): paths to model and scorer
+    """
+    return (os.path.join(cache_dir, f"coqui-{lang}-models.pbmm"),
+            os.path.join(cache_dir, f"coqui-{lang}-models.scorer"))
+
+
+def _total_size(resp, offset: int) -> Optional[int]:
+    """
+    Returns the size of the complete file from the headers of a download
+    response, None if the server did not send it.
+
+    Parameters:
+                resp (requests.Response): response to a download request
+                offset (int): first byte requested
+    Returns:
+                (int): total bytes of the file
+    """
+    headers = resp.headers or {}
+    # `bytes 100-199/200` for partial content, `bytes */200` for 416
+    content_range = headers.get('Content-Range', '')
+    total = content_range.rpartition('/')[2].strip()
+    if total.isdigit():
+        return int(total)
+    length = headers.get('Content-Length', '')
+    # An encoded body is decoded while streaming, so its length differs
+    if resp.status_code not in (200, 206) or not length.isdigit() or \
+            headers.get('Content-Encoding', 'identity') != 'identity':
+        return None
+    return int(length) + (offset if resp.status_code == 206 else 0)
+
+
+def _download_part(url: str, part_path: str, chunk_size: int,
+                   timeout: float) -> Optional[int]:
+    """
+    Downloads `url` into `part_path`, resuming from the end of an existing
+    partial file if the server supports Range requests.
+
+    Returns:
+                (int): size of the complete file reported by the server,
+                    None if unknown
+    Raises:
+                RequestException: if the connection closed before the
+                    reported size was received
+    """
+    import requests
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    with requests.get(url, headers=headers, stream=True,
+                      allow_redirects=True, timeout=timeout) as resp:
+        if resp.status_code == 416:
+            # Requested range starts at the end of the file; nothing left
+            return _total_size(resp, offset)
+        resp.raise_for_status()
+        if offset and resp.status_code != 206:
+            LOG.warning(f"Server does not support resume, restarting {url}")
+            offset = 0
+        if offset:
+            LOG.info(f"Resuming download of {url} at byte {offset}")
+        total = _total_size(resp, offset)
+        with open(part_path, 'ab' if offset else 'wb') as out:
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                out.write(chunk)
+    # requests does not check that the whole body was received
+    received = os.path.getsize(part_path)
+    if total is not None and received < total:
+        raise requests.RequestException(f"Connection closed after {received} "
+                                        f"of {total} bytes")
+    return total
+
+
+def download_file(url: str, path: str, sha256: Optional[str] = None,
+                  size: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                  retries: int = 3, timeout: float = 30) -> str:
+    """
+    Downloads a file to `path` if it does not exist. Data is streamed to a
+    `.part` file that is renamed into place once complete and verified, so
+    `path` never holds a partial file. Interrupted downloads, including
+    connections closed before the size reported by the server was received,
+    are resumed and concurrent processes wait for a single download.
+
+    Parameters:
+                url (str): url to download
+                path (str): destination file path
+                sha256 (str): expected hex digest, None to skip verification
+                size (int): expected size in bytes, None to skip verification
+                chunk_size (int): bytes to write at a time
+                retries (int): download attempts before raising
+                timeout (float): seconds to wait for the server
+    Returns:
+                path (str): path to the downloaded file
+    """
+    if os.path.isfile(path):
+        return path
+    from requests import RequestException
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _file_lock(f"{path}.lock"):
+        # Another process may have finished the download while we waited
+        if os.path.isfile(path):
+            return path
+        part_path = f"{path}.part"
+        for attempt in range(1, retries + 1):
+            try:
+                LOG.info(f"Downloading {url}")
+                with timed("download_seconds"):
+                    total = _download_part(url, part_path, chunk_size,
+                                           timeout)
+                break
+            except RequestException as e:
+                LOG.warning(f"Download attempt {attempt} failed: {e}")
+                if attempt == retries:
+                    raise
+        try:
+            # Without a known size, check against the server's size
+            verify_file(part_path, sha256,
+                        size if size is not None else total, chunk_size)
+        except ValueError:
+            os.remove(part_path)
+            raise
+        if not sha256:
+            LOG.warning(f"No checksum for {url}, caching {path} unverified")
+        os.replace(part_path, path)
+    get_metrics_sink().increment("download_bytes", os.path.getsize(path))
+    LOG.info(f"Downloaded {url} to {path}")
+    return path
@@ -0,0 +1,190 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from collections import OrderedDict
+from threading import Lock, RLock
+from typing import Callable, Dict, List, Optional, Tuple
+
+from neon_utils.logger import LOG
+
+from neon_stt_plugin_coqui.metrics import get_metrics_sink
+
+
+class PooledModel:
+    def __init__(self, lang: str, model, scorer: Optional[str] = None,
+                 size: int = 0):
+        """
+        A loaded deepspeech model shared between CoquiSTT instances.
+
+        Parameters:
+                    lang (str): language code the model was loaded for
+                    model (deepspeech.Model): loaded model
+                    scorer (str): path to the enabled scorer, if any
+                    size (int): estimated memory footprint in bytes
+        """
+        self.lang = lang
+        self.model = model
+        self.scorer = scorer
+        self.size = size
+        # Decoder settings (beam width, hot words, scorer weights) are
+        # per-model state, so any decode that changes them must hold this
+        # lock until its stream is created
+        self.lock = RLock()
+        self.hotwords: Dict[str, float] = dict()
+        self.beam_width: Optional[int] = None
+        # None while the scorer uses the weights stored in the scorer file
+        self.alpha_beta: Optional[Tuple[float, float]] = None
+        # Smoothed decode seconds per (audio second * beam width)
+        self.decode_cost: Optional[float] = None
+
+    def update_decode_cost(self, decode_time: float, audio_length: float,
+                           beam_width: int, smoothing: float = 0.2):
+        """
+        Records the cost of a decode for latency estimates.
+
+        Parameters:
+                    decode_time (float): seconds spent decoding
+                    audio_length (float): seconds of audio decoded
+                    beam_width (int): beam width used for the decode
+                    smoothing (float): weight of the new measurement
+        """
+        if audio_length <= 0 or beam_width <= 0:
+            return
+        cost = decode_time / (audio_length * beam_width)
+        if self.decode_cost is None:
+            self.decode_cost = cost
+        else:
+            self.decode_cost += smoothing * (cost - self.decode_cost)
+
+    def estimate_decode_time(self, audio_length: float,
+                             beam_width: int) -> Optional[float]:
+        """
+        Estimates decode seconds for an utterance from previous decodes.
+
+        Parameters:
+                    audio_length (float): seconds of audio to decode
+                    beam_width (int): beam width to decode with
+        Returns:
+                    (float): estimated seconds, None if no decodes recorded
+        """
+        if self.decode_cost is None:
+            return None
+        return self.decode_cost * audio_length * beam_width
+
+
+class ModelPool:
+    def __init__(self, memory_budget: Optional[int] = None):
+        """
+        Process-wide registry of loaded models keyed by language. Models are
+        loaded on first use and the least recently used models are evicted
+        when the total size exceeds the memory budget.
+
+        Parameters:
+                    memory_budget (int): max bytes of loaded models, None for
+                        no limit
+        """
+        self.memory_budget = memory_budget
+        self._models: "OrderedDict[str, PooledModel]" = OrderedDict()
+        self._lock = Lock()
+        self._loading_locks: Dict[str, Lock] = dict()
+
+    @property
+    def loaded_languages(self) -> List[str]:
+        with self._lock:
+            return list(self._models.keys())
+
+    @property
+    def total_size(self) -> int:
+        with self._lock:
+            return sum(m.size for m in self._models.values())
+
+    def get(self, lang: str,
+            loader: Callable[[str], PooledModel]) -> PooledModel:
+        """
+        Returns the model for the requested language, loading it if needed.
+
+        Parameters:
+                    lang (str): language code
+                    loader (callable): loads a PooledModel for a language
+        Returns:
+                    (PooledModel): loaded model
+        """
+        with self._lock:
+            if lang in self._models:
+                self._models.move_to_end(lang)
+                get_metrics_sink().increment("model_pool_hits",
+                                             tags={"lang": lang})
+                return self._models[lang]
+            loading_lock = self._loading_locks.setdefault(lang, Lock())
+        get_metrics_sink().increment("model_pool_misses", tags={"lang": lang})
+        with loading_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                if lang in self._models:
+                    self._models.move_to_end(lang)
+                    return self._models[lang]
+            pooled = loader(lang)
+            with self._lock:
+                self._models[lang] = pooled
+                self._evict()
+            return pooled
+
+    def evict(self, lang: str) -> bool:
+        """
+        Removes a model from the pool.
+
+        Parameters:
+                    lang (str): language code
+        Returns:
+                    (bool): True if a model was removed
+        """
+        with self._lock:
+            return self._models.pop(lang, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def _evict(self):
+        """
+        Evicts least recently used models until the pool fits the budget.
+        The most recently used model is always kept. Must hold self._lock.
+        """
+        if not self.memory_budget:
+            return
+        total = sum(m.size for m in self._models.values())
+        while total > self.memory_budget and len(self._models) > 1:
+            lang, pooled = self._models.popitem(last=False)
+            total -= pooled.size
+            LOG.info(f"Evicted {lang} model ({pooled.size} bytes)")
+            get_metrics_sink().increment("model_pool_evictions",
+                                         tags={"lang": lang})
+
+
+MODEL_POOL = ModelPool()
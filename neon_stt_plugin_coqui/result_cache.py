@@ -0,0 +1,144 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from neon_stt_plugin_coqui.metrics import get_metrics_sink
+
+
+class TranscriptionCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = None,
+                 sqlite_path: str = None):
+        """
+        Cache of transcriptions keyed by an audio fingerprint. Entries are
+        kept in memory with LRU eviction and optionally in a sqlite database
+        that can be shared between processes.
+
+        Parameters:
+                    max_entries (int): max entries kept in memory
+                    ttl (float): seconds before an entry expires, None to
+                        keep entries until evicted
+                    sqlite_path (str): path to a sqlite database, None to
+                        only cache in memory
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = Lock()
+        self._db = None
+        if sqlite_path:
+            sqlite_path = os.path.expanduser(sqlite_path)
+            os.makedirs(os.path.dirname(os.path.abspath(sqlite_path)),
+                        exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, timeout=10,
+                                       check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS transcriptions "
+                             "(key TEXT PRIMARY KEY, text TEXT, "
+                             "created REAL)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(audio: np.ndarray, *identity) -> str:
+        """
+        Builds a cache key from audio samples and the decoder settings that
+        affect the transcription.
+
+        Parameters:
+                    audio (numpy array): contiguous audio samples
+                    identity: values identifying the model and settings
+        Returns:
+                    (str): hex digest
+        """
+        sha = hashlib.sha256(repr(identity).encode())
+        sha.update(memoryview(np.ascontiguousarray(audio)).cast('B'))
+        return sha.hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time() - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns a cached transcription, or None if not cached or expired.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and self._expired(entry[1]):
+                del self._memory[key]
+                entry = None
+            if entry:
+                self._memory.move_to_end(key)
+                get_metrics_sink().increment("result_cache_hits")
+                return entry[0]
+            if self._db:
+                row = self._db.execute("SELECT text, created FROM "
+                                       "transcriptions WHERE key = ?",
+                                       (key,)).fetchone()
+                if row and not self._expired(row[1]):
+                    self._put_memory(key, row[0], row[1])
+                    get_metrics_sink().increment("result_cache_hits")
+                    return row[0]
+        get_metrics_sink().increment("result_cache_misses")
+        return None
+
+    def put(self, key: str, text: str):
+        """
+        Adds a transcription to the cache.
+        """
+        created = time()
+        with self._lock:
+            self._put_memory(key, text, created)
+            if self._db:
+                self._db.execute("INSERT OR REPLACE INTO transcriptions "
+                                 "VALUES (?, ?, ?)", (key, text, created))
+                if self.ttl is not None:
+                    self._db.execute("DELETE FROM transcriptions WHERE "
+                                     "created < ?", (created - self.ttl,))
+                self._db.commit()
+
+    def _put_memory(self, key: str, text: str, created: float):
+        self._memory[key] = (text, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db:
+                self._db.execute("DELETE FROM transcriptions")
+                self._db.commit()
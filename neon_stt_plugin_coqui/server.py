@@ -0,0 +1,215 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import argparse
+import json
+from typing import List
+from uuid import uuid4
+
+import numpy as np
+from aiohttp import WSMsgType, web
+from neon_utils.logger import LOG
+from speech_recognition import AudioData
+
+from neon_stt_plugin_coqui.async_executor import AsyncExecutor, \
+    DecoderSaturatedError
+from neon_stt_plugin_coqui.audio_utils import downmix, parse_wav_bytes, \
+    to_int16
+from neon_stt_plugin_coqui.sessions import SessionLimitError, \
+    StreamSessionManager
+
+
+def _parse_audio(body: bytes, query, stt) -> AudioData:
+    """
+    Reads a request body as a wav file, or as raw 16-bit mono PCM at the
+    `sample_rate` query parameter if it has no RIFF header. Raw audio
+    defaults to the manifest sample rate of the requested language.
+    """
+    if body[:4] == b'RIFF':
+        audio, sample_rate, channels = parse_wav_bytes(body)
+        if channels != 1:
+            audio = to_int16(downmix(audio, channels))
+    else:
+        if len(body) % 2:
+            raise ValueError("Raw audio must be 16-bit PCM")
+        audio = np.frombuffer(body, dtype=np.int16)
+        sample_rate = int(query.get('sample_rate') or stt.manifest[
+            stt.resolve_lang(query.get('lang'))].sample_rate)
+    return AudioData(audio, sample_rate, 2)
+
+
+async def _transcribe(request: web.Request) -> web.Response:
+    stt = request.app['stt']
+    lang = request.query.get('lang')
+    # Decoding before the model is loaded would block on the load
+    if stt.loading_state != "ready":
+        raise web.HTTPServiceUnavailable(text=f"Model {stt.loading_state}")
+    try:
+        audio = _parse_audio(await request.read(), request.query, stt)
+    except (ValueError, RuntimeError) as e:
+        raise web.HTTPBadRequest(text=str(e))
+    try:
+        text = await stt.execute_async(audio, lang)
+    except DecoderSaturatedError as e:
+        raise web.HTTPServiceUnavailable(text=str(e))
+    except RuntimeError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    return web.json_response({"transcription": text})
+
+
+async def _stream(request: web.Request) -> web.WebSocketResponse:
+    """
+    Streams binary 16-bit PCM chunks at the model sample rate. The text
+    message `finish` ends the stream; the server replies with
+    `{"transcription": ...}` and closes. With `?partial=true` each chunk is
+    answered with `{"partial": ...}`.
+    """
+    sessions: StreamSessionManager = request.app['sessions']
+    executor: AsyncExecutor = request.app['stream_executor']
+    lang = request.query.get('lang')
+    partial = request.query.get('partial', '').lower() == 'true'
+    session_id = uuid4().hex
+
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    try:
+        await executor.run(sessions.open, session_id, lang)
+    except (SessionLimitError, DecoderSaturatedError, RuntimeError) as e:
+        await ws.send_json({"error": str(e)})
+        await ws.close()
+        return ws
+
+    try:
+        async for msg in ws:
+            if msg.type == WSMsgType.BINARY:
+                text = await executor.run(sessions.feed, session_id,
+                                          msg.data, partial)
+                if partial:
+                    await ws.send_json({"partial": text})
+            elif msg.type == WSMsgType.TEXT and msg.data == 'finish':
+                text = await executor.run(sessions.finish, session_id)
+                await ws.send_json({"transcription": text})
+                break
+            elif msg.type == WSMsgType.ERROR:
+                LOG.error(f"Stream error: {ws.exception()}")
+                break
+    except KeyError:
+        # The idle reaper freed the session
+        await ws.send_json({"error": "Stream session expired"})
+    except RuntimeError as e:
+        # Includes DecoderSaturatedError
+        await ws.send_json({"error": str(e)})
+    finally:
+        sessions.close(session_id)
+        await ws.close()
+    return ws
+
+
+async def _health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+async def _ready(request: web.Request) -> web.Response:
+    stt = request.app['stt']
+    status = {"status": stt.loading_state,
+              "requests": stt.async_stats,
+              "streams": request.app['stream_executor'].stats,
+              "sessions": request.app['sessions'].stats}
+    return web.json_response(status,
+                             status=200 if status["status"] == "ready"
+                             else 503)
+
+
+async def _cleanup(app: web.Application):
+    app['sessions'].shutdown()
+    app['stream_executor'].shutdown()
+
+
+def create_app(stt, max_sessions: int = 100, idle_timeout: float = 30.0,
+               stream_workers: int = None,
+               max_upload_mb: int = 100) -> web.Application:
+    """
+    Builds the transcription server around a plugin instance. All requests
+    share the plugin's loaded models.
+
+    Endpoints:
+                POST /stt?lang=: wav or raw 16-bit PCM body
+                GET /stream?lang=&partial=: WebSocket streaming
+                GET /health: liveness
+                GET /ready: 200 once the model is loaded, with queue stats
+
+    Parameters:
+                stt (CoquiSTT): plugin instance
+                max_sessions (int): max concurrent WebSocket streams
+                idle_timeout (float): seconds before an idle stream is freed
+                stream_workers (int): threads decoding stream chunks
+                max_upload_mb (int): max POST body size
+    Returns:
+                (web.Application): server application
+    """
+    app = web.Application(client_max_size=max_upload_mb * 1024 * 1024)
+    app['stt'] = stt
+    app['sessions'] = StreamSessionManager(stt, max_sessions, idle_timeout)
+    app['stream_executor'] = AsyncExecutor(stream_workers,
+                                           max_pending=max_sessions)
+    app.router.add_post('/stt', _transcribe)
+    app.router.add_get('/stream', _stream)
+    app.router.add_get('/health', _health)
+    app.router.add_get('/ready', _ready)
+    app.on_cleanup.append(_cleanup)
+    return app
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description="Serve Coqui STT over HTTP and WebSocket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--config", help="path to JSON plugin config")
+    parser.add_argument("--lang", help="default language")
+    parser.add_argument("--max-sessions", type=int, default=100)
+    parser.add_argument("--idle-timeout", type=float, default=30.0)
+    parsed = parser.parse_args(args)
+
+    config = dict()
+    if parsed.config:
+        with open(parsed.config) as f:
+            config = json.load(f)
+    if parsed.lang:
+        config['lang'] = parsed.lang
+    config.setdefault('lazy_load', True)
+
+    from neon_stt_plugin_coqui import CoquiSTT
+    stt = CoquiSTT(config)
+    web.run_app(create_app(stt, parsed.max_sessions, parsed.idle_timeout),
+                host=parsed.host, port=parsed.port)
+
+
+if __name__ == "__main__":
+    main()
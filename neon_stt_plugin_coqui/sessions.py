@@ -0,0 +1,233 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Dict, List, Optional
+
+from neon_utils.logger import LOG
+
+from neon_stt_plugin_coqui.metrics import get_metrics_sink
+
+
+class SessionLimitError(RuntimeError):
+    """
+    Raised when a session is opened while the session limit is reached.
+    """
+
+
+class StreamSession:
+    def __init__(self, session_id: str, lang: Optional[str], stream,
+                 pooled=None):
+        """
+        A live audio stream being decoded for one client.
+
+        Parameters:
+                    session_id (str): unique session identifier
+                    lang (str): language code of the session
+                    stream (deepspeech.Stream): decoding stream
+                    pooled (PooledModel): model the stream decodes with
+        """
+        self.session_id = session_id
+        self.lang = lang
+        self.stream = stream
+        # Streams do not keep their model alive; holding it here keeps an
+        # evicted model from being freed while the session is open
+        self.pooled = pooled
+        self.created = self.last_active = monotonic()
+        # A stream must only be fed by one thread at a time
+        self.lock = Lock()
+
+
+class StreamSessionManager:
+    def __init__(self, stt, max_sessions: int = 100,
+                 idle_timeout: float = 30.0,
+                 reap_interval: Optional[float] = 5.0):
+        """
+        Multiplexes many concurrent live audio streams onto the shared models
+        of a CoquiSTT instance. Sessions idle longer than `idle_timeout` are
+        freed.
+
+        Parameters:
+                    stt (CoquiSTT): plugin instance used to create streams
+                    max_sessions (int): max concurrently open sessions
+                    idle_timeout (float): seconds without audio before a
+                        session is freed
+                    reap_interval (float): seconds between idle checks in a
+                        background thread, None to only check when sessions
+                        are opened
+        """
+        self.stt = stt
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: Dict[str, StreamSession] = dict()
+        self._lock = Lock()
+        self._stop_event = Event()
+        if reap_interval:
+            Thread(target=self._reap_loop, args=(reap_interval,),
+                   daemon=True).start()
+
+    @property
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions.keys())
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active_sessions": len(self._sessions),
+                    "max_sessions": self.max_sessions}
+
+    def open(self, session_id: str, language: str = None,
+             hotwords: Optional[Dict[str, float]] = None):
+        """
+        Opens a session. An existing session with the same ID is replaced.
+
+        Parameters:
+                    session_id (str): unique session identifier
+                    language (str): language code associated with audio
+                    hotwords (dict): words to boost for this session only
+        """
+        self.close(session_id)
+        with self._lock:
+            full = len(self._sessions) >= self.max_sessions
+        if full:
+            self.reap_idle()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(f"{len(self._sessions)} sessions "
+                                        f"open")
+            # Reserve the slot while the stream is created
+            session = StreamSession(session_id, language, None)
+            self._sessions[session_id] = session
+        try:
+            session.pooled, session.stream = \
+                self.stt.create_stream(language, hotwords)
+        except Exception:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+            raise
+        get_metrics_sink().increment("sessions_opened")
+
+    def _get(self, session_id: str) -> StreamSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if not session or session.stream is None:
+            raise KeyError(f"No open session: {session_id}")
+        return session
+
+    def feed(self, session_id: str, data, partial: bool = False) \
+            -> Optional[str]:
+        """
+        Feeds a chunk of audio to a session.
+
+        Parameters:
+                    session_id (str): session identifier
+                    data (bytes, numpy array, AudioData): 16-bit PCM chunk at
+                        the model sample rate
+                    partial (bool): if True, return a partial transcript
+        Returns:
+                    text (str): partial transcript if requested, else None
+        """
+        session = self._get(session_id)
+        with session.lock:
+            session.last_active = monotonic()
+            session.stream.feedAudioContent(self.stt._to_int16(data))
+            if partial:
+                return str(session.stream.intermediateDecode())
+        return None
+
+    def finish(self, session_id: str) -> str:
+        """
+        Finishes a session and returns its final transcript.
+
+        Parameters:
+                    session_id (str): session identifier
+        Returns:
+                    text (str): recognized text
+        """
+        session = self._pop(session_id)
+        with session.lock:
+            return str(session.stream.finishStream())
+
+    def close(self, session_id: str) -> bool:
+        """
+        Frees a session without decoding it.
+
+        Parameters:
+                    session_id (str): session identifier
+        Returns:
+                    (bool): True if a session was closed
+        """
+        try:
+            session = self._pop(session_id)
+        except KeyError:
+            return False
+        with session.lock:
+            session.stream.freeStream()
+        return True
+
+    def _pop(self, session_id: str) -> StreamSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if not session or session.stream is None:
+                raise KeyError(f"No open session: {session_id}")
+            return self._sessions.pop(session_id)
+
+    def reap_idle(self) -> List[str]:
+        """
+        Frees sessions that have not received audio within the idle timeout.
+
+        Returns:
+                    (list): IDs of freed sessions
+        """
+        cutoff = monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [s.session_id for s in self._sessions.values()
+                    if s.stream is not None and s.last_active < cutoff]
+        for session_id in idle:
+            if self.close(session_id):
+                LOG.info(f"Closed idle session: {session_id}")
+                get_metrics_sink().increment("sessions_expired")
+        return idle
+
+    def _reap_loop(self, interval: float):
+        while not self._stop_event.wait(interval):
+            try:
+                self.reap_idle()
+            except Exception as e:
+                LOG.exception(e)
+
+    def shutdown(self):
+        """
+        Stops the idle check thread and frees all sessions.
+        """
+        self._stop_event.set()
+        for session_id in self.session_ids:
+            self.close(session_id)
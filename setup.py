@@ -39,6 +39,9 @@ def get_requirements(requirements_filename: str):
 
 
 PLUGIN_ENTRY_POINT = 'neon-stt-plugin-coqui = neon_stt_plugin_coqui:CoquiSTT'
+BENCHMARK_ENTRY_POINT = 'neon-stt-coqui-benchmark = neon_stt_plugin_coqui.benchmark:main'
+SERVER_ENTRY_POINT = 'neon-stt-coqui-server = neon_stt_plugin_coqui.server:main'
+MODELS_ENTRY_POINT = 'neon-stt-coqui-models = neon_stt_plugin_coqui.manifest:main'
 
 with open("README.md", "r") as f:
     long_description = f.read()
@@ -64,12 +67,18 @@ setup(
     package_data={"neon_stt_plugin_coqui": ["*.yml"]},
     author_email='mariia@neon.ai',
     install_requires=get_requirements("requirements.txt"),
+    extras_require={"server": get_requirements("server.txt")},
     zip_safe=True,
     classifiers=[
         'Intended Audience :: Developers',
         'Topic :: Text Processing :: Linguistic',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
     ],
+    python_requires='>=3.7',
     keywords='mycroft plugin stt',
-    entry_points={'mycroft.plugin.stt': PLUGIN_ENTRY_POINT}
+    entry_points={'mycroft.plugin.stt': PLUGIN_ENTRY_POINT,
+                  'console_scripts': [BENCHMARK_ENTRY_POINT,
+                                      SERVER_ENTRY_POINT,
+                                      MODELS_ENTRY_POINT]}
 )
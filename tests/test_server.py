@@ -0,0 +1,124 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2021 Neongecko.com Inc.
+#
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the
+# following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice, this list of conditions
+#    and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice, this list of conditions
+#    and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its contributors may be used to endorse or promote
+#    products derived from this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+# INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import asyncio
+import unittest
+from unittest import mock
+import numpy as np
+from aiohttp import test_utils
+
+from neon_stt_plugin_coqui import CoquiSTT
+from neon_stt_plugin_coqui.server import create_app
+
+ROOT_DIR = os.path.dirname(os.path.realpath(__file__))
+TEST_PATH_EN = os.path.join(ROOT_DIR, "test_audio/en/male")
+
+
+class TestSTTServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stt = CoquiSTT('en')
+        cls.file = os.path.join(TEST_PATH_EN, 'neon_what_is_the_date.wav')
+        _, audio_data = cls.stt.get_audio_data(cls.file)
+        cls.audio = np.asarray(audio_data.frame_data)
+        cls.expected = cls.stt.execute(audio_data)
+
+    def _run(self, test):
+        async def _with_client():
+            app = create_app(self.stt, max_sessions=1)
+            async with test_utils.TestClient(
+                    test_utils.TestServer(app)) as client:
+                await test(client)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(_with_client())
+        finally:
+            loop.close()
+
+    def test_health_ready(self):
+        async def test(client):
+            resp = await client.get('/health')
+            self.assertEqual(resp.status, 200)
+            resp = await client.get('/ready')
+            self.assertEqual(resp.status, 200)
+            self.assertEqual((await resp.json())['status'], 'ready')
+        self._run(test)
+
+    def test_transcribe(self):
+        async def test(client):
+            with open(self.file, 'rb') as f:
+                resp = await client.post('/stt?lang=en', data=f.read())
+            self.assertEqual(resp.status, 200)
+            self.assertEqual((await resp.json())['transcription'],
+                             self.expected)
+            resp = await client.post('/stt', data=b'\0' * 3)
+            self.assertEqual(resp.status, 400)
+        self._run(test)
+
+    def test_transcribe_while_loading(self):
+        async def test(client):
+            with mock.patch.object(CoquiSTT, 'loading_state',
+                                   new_callable=mock.PropertyMock,
+                                   return_value='loading'):
+                resp = await client.post('/stt', data=b'\0' * 320)
+                self.assertEqual(resp.status, 503)
+                resp = await client.get('/health')
+                self.assertEqual(resp.status, 200)
+        self._run(test)
+
+    def test_stream(self):
+        async def test(client):
+            ws = await client.ws_connect('/stream?lang=en')
+            # Only one session is allowed
+            rejected = await client.ws_connect('/stream')
+            self.assertIn('error', await rejected.receive_json())
+            chunk_size = self.stt.model.sampleRate() // 5
+            for start in range(0, len(self.audio), chunk_size):
+                await ws.send_bytes(
+                    self.audio[start:start + chunk_size].tobytes())
+            await ws.send_str('finish')
+            self.assertEqual((await ws.receive_json())['transcription'],
+                             self.expected)
+            await ws.close()
+        self._run(test)
+
+    def test_stream_expired(self):
+        async def test(client):
+            ws = await client.ws_connect('/stream?partial=true')
+            chunk = self.audio[:self.stt.model.sampleRate() // 5].tobytes()
+            await ws.send_bytes(chunk)
+            self.assertIn('partial', await ws.receive_json())
+            sessions = client.app['sessions']
+            for session_id in sessions.session_ids:
+                sessions.close(session_id)
+            await ws.send_bytes(chunk)
+            self.assertIn('error', await ws.receive_json())
+            await ws.close()
+        self._run(test)
+
+
+if __name__ == '__main__':
+    unittest.main()
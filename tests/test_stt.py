@@ -23,12 +23,46 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
-from neon_stt_plugin_coqui import CoquiSTT
+from neon_stt_plugin_coqui import CoquiSTT, MIN_BEAM_WIDTH
+from neon_stt_plugin_coqui.async_executor import AsyncExecutor, \
+    DecoderSaturatedError
+from neon_stt_plugin_coqui.benchmark import character_error_rate, \
+    compare_to_baseline
+from neon_stt_plugin_coqui.manifest import load_manifest, parse_entry, \
+    record_checksums
+from neon_stt_plugin_coqui.metadata import tokens_to_words
+from neon_stt_plugin_coqui.model_cache import download_file
+from neon_stt_plugin_coqui.model_pool import MODEL_POOL, ModelPool, \
+    PooledModel
+from neon_stt_plugin_coqui.metrics import MetricsSink, PrometheusSink, \
+    configure_metrics, get_metrics_sink, set_metrics_sink
+from neon_stt_plugin_coqui.result_cache import TranscriptionCache
+from neon_stt_plugin_coqui.sessions import SessionLimitError, \
+    StreamSessionManager
+from neon_stt_plugin_coqui.audio_utils import convert_audio, frame_energy, \
+    noise_gate, pcm_to_int16, preprocess, preprocessing_options, read_wav, \
+    split_on_silence
 from ovos_utils.log import LOG
 import neon_utils.parse_utils
+import gc
+import socket
+import threading
 import unittest
+from unittest import mock
+import tempfile
+from collections import namedtuple
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import time
+import hashlib
+import wave
+import weakref
+import numpy as np
+from speech_recognition import AudioData
 import pandas as pd
 from jiwer import cer
+import requests
 from timeit import default_timer as timer
 from datetime import date
 
@@ -56,11 +90,11 @@ class TestGetSTT(unittest.TestCase):
         ground_truth = []
         hypothesis = []
         df_list = []
+        stt = CoquiSTT(lang)
         for file in os.listdir(folder):
             transcription = ' '.join(file[:-4].split('_')).lower()
             ground_truth.append(transcription)
             path = folder+'/'+file
-            stt = CoquiSTT(lang)
             LOG.info('Running inference.')
             inference_start = timer()
             audio_length, audio_data = stt.get_audio_data(path)
@@ -114,6 +148,877 @@ class TestGetSTT(unittest.TestCase):
         self.evaluation_script(male_folder, 'pl', 'pl_report_male')
         self.evaluation_script(female_folder, 'pl', 'pl_report_female')
 
+    def test_en_streaming(self):
+        LOG.info("ENGLISH STREAMING STT")
+        stt = CoquiSTT('en')
+        male_folder = TEST_PATH_EN + '/male'
+        for file in os.listdir(male_folder)[:3]:
+            _, audio_data = stt.get_audio_data(male_folder + '/' + file)
+            audio = audio_data.get_raw_data()
+            expected = stt.execute(audio_data)
+            stt.stream_start()
+            chunk_size = stt.model.sampleRate() // 5
+            for i in range(0, len(audio), chunk_size):
+                partial = stt.stream_data(audio[i:i + chunk_size])
+                self.assertIsInstance(partial, str)
+            self.assertEqual(stt.stream_stop(), expected)
+
+    def test_en_batch(self):
+        LOG.info("ENGLISH BATCH STT")
+        stt = CoquiSTT({'lang': 'en', 'batch_workers': 2})
+        male_folder = TEST_PATH_EN + '/male'
+        files = [male_folder + '/' + f for f in os.listdir(male_folder)[:4]]
+        expected = [stt.execute(stt.get_audio_data(f)[1]) for f in files]
+        try:
+            self.assertEqual(stt.transcribe_batch(files), expected)
+        finally:
+            stt.shutdown_batch()
+
+    def test_en_long_form(self):
+        LOG.info("ENGLISH LONG FORM STT")
+        stt = CoquiSTT({'lang': 'en', 'batch_workers': 2})
+        male_folder = TEST_PATH_EN + '/male'
+        files = sorted(os.listdir(male_folder))[:4]
+        parts = []
+        expected = []
+        for file in files:
+            _, audio_data = stt.get_audio_data(male_folder + '/' + file)
+            expected.append(stt.execute(audio_data))
+            parts.append(np.asarray(audio_data.frame_data))
+            parts.append(np.zeros(audio_data.sample_rate, dtype=np.int16))
+        audio = AudioData(np.concatenate(parts), audio_data.sample_rate, 2)
+        try:
+            results = list(stt.transcribe_long(audio))
+        finally:
+            stt.shutdown_batch()
+        self.assertEqual(len(results), len(files))
+        self.assertEqual(sorted(results, key=lambda r: r['start']), results)
+        error = cer(expected, [r['text'] for r in results])
+        self.assertLess(error, 0.1)
+
+    def test_en_execute_async(self):
+        LOG.info("ENGLISH ASYNC STT")
+        stt = CoquiSTT({'lang': 'en', 'async_workers': 2})
+        male_folder = TEST_PATH_EN + '/male'
+        audio = [stt.get_audio_data(male_folder + '/' + f)[1]
+                 for f in os.listdir(male_folder)[:3]]
+        expected = [stt.execute(a) for a in audio]
+
+        async def _run():
+            return await asyncio.gather(*[stt.execute_async(a)
+                                          for a in audio])
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertEqual(loop.run_until_complete(_run()), expected)
+        finally:
+            loop.close()
+        self.assertEqual(stt.async_stats['in_flight'], 0)
+
+    def test_en_metadata(self):
+        LOG.info("ENGLISH STT METADATA")
+        stt = CoquiSTT('en')
+        male_folder = TEST_PATH_EN + '/male'
+        for file in os.listdir(male_folder)[:3]:
+            _, audio_data = stt.get_audio_data(male_folder + '/' + file)
+            results = stt.execute_with_metadata(audio_data, num_results=2)
+            self.assertTrue(1 <= len(results) <= 2)
+            self.assertEqual(results[0]['transcript'],
+                             ' '.join(stt.execute(audio_data).split()))
+            starts = [w['start_time'] for w in results[0]['words']]
+            self.assertEqual(starts, sorted(starts))
+
+    def test_lazy_load(self):
+        LOG.info("LAZY LOADED STT")
+        # Earlier tests may have loaded the model into the shared pool
+        MODEL_POOL.evict('en')
+        stt = CoquiSTT({'lang': 'en', 'lazy_load': True})
+        self.assertEqual(stt.loading_state, 'loading')
+        self.assertTrue(stt.wait_until_ready(300))
+        self.assertEqual(stt.loading_state, 'ready')
+        male_folder = TEST_PATH_EN + '/male'
+        _, audio_data = stt.get_audio_data(
+            male_folder + '/' + os.listdir(male_folder)[0])
+        self.assertIsInstance(stt.execute(audio_data), str)
+
+    def test_lazy_load_error(self):
+        MODEL_POOL.evict('en')
+        with mock.patch.object(CoquiSTT, '_load_model',
+                               side_effect=RuntimeError("offline")):
+            stt = CoquiSTT({'lang': 'en', 'lazy_load': True})
+            self.assertFalse(stt.wait_until_ready(10))
+            self.assertEqual(stt.loading_state, 'error')
+        # A later request loads the model through the pool
+        self.assertIsNotNone(stt.model)
+        self.assertEqual(stt.loading_state, 'ready')
+
+    def test_en_request_hotwords(self):
+        LOG.info("ENGLISH STT REQUEST HOTWORDS")
+        stt = CoquiSTT('en')
+        male_folder = TEST_PATH_EN + '/male'
+        _, audio_data = stt.get_audio_data(
+            male_folder + '/neon_tell_me_about_pierogie.wav')
+        expected = stt.execute(audio_data)
+        boosted = stt.execute(audio_data, hotwords={'pierogie': 10.0})
+        self.assertIsInstance(boosted, str)
+        # Request hot words must not persist to later decodes
+        self.assertEqual(stt.execute(audio_data), expected)
+
+    def test_en_stream_sessions(self):
+        LOG.info("ENGLISH STREAM SESSIONS")
+        stt = CoquiSTT('en')
+        manager = StreamSessionManager(stt, max_sessions=2,
+                                       reap_interval=None)
+        male_folder = TEST_PATH_EN + '/male'
+        files = os.listdir(male_folder)[:2]
+        audio = [stt.get_audio_data(male_folder + '/' + f)[1] for f in files]
+        expected = [stt.execute(a) for a in audio]
+        try:
+            for i in range(2):
+                manager.open(str(i))
+            with self.assertRaises(SessionLimitError):
+                manager.open('2')
+            # Interleave chunks from both sessions
+            chunk_size = stt.model.sampleRate() // 5
+            buffers = [np.asarray(a.frame_data) for a in audio]
+            for start in range(0, max(len(b) for b in buffers), chunk_size):
+                for i, buffer in enumerate(buffers):
+                    if start < len(buffer):
+                        manager.feed(str(i), buffer[start:start + chunk_size])
+            self.assertEqual([manager.finish(str(i)) for i in range(2)],
+                             expected)
+            self.assertEqual(manager.stats['active_sessions'], 0)
+        finally:
+            manager.shutdown()
+
+    def test_detect_language(self):
+        LOG.info("LANGUAGE DETECTION")
+        stt = CoquiSTT({'lang': 'auto', 'language_candidates': ['en', 'pl']})
+        for lang, folder in (('en', TEST_PATH_EN + '/male'),
+                             ('pl', TEST_PATH_PL + '/male')):
+            files = sorted(f for f in os.listdir(folder)
+                           if f.startswith('neon'))[:3]
+            detected = [stt.detect_language(
+                stt.get_audio_data(folder + '/' + f)[1]) for f in files]
+            self.assertGreaterEqual(detected.count(lang), 2)
+
+    def test_detect_language_cached(self):
+        stt = CoquiSTT({'lang': 'auto', 'language_candidates': ['en', 'pl'],
+                        'result_cache': {'max_entries': 8}})
+        _, audio = stt.get_audio_data(
+            TEST_PATH_EN + '/male/neon_what_is_the_date.wav')
+        with mock.patch.object(stt, 'detect_language',
+                               wraps=stt.detect_language) as detect:
+            first = stt.execute(audio)
+            self.assertEqual(stt.execute(audio), first)
+        self.assertEqual(detect.call_count, 1)
+
+    def test_lang_normalized(self):
+        stt = CoquiSTT({'lang': 'en-us', 'language_candidates': ['EN', 'pl']})
+        self.assertEqual(stt.lang, 'en')
+        self.assertEqual(stt.language_candidates, ['en', 'pl'])
+        with self.assertRaises(RuntimeError):
+            CoquiSTT({'lang': 'xx'})
+
+
+class TestMetadata(unittest.TestCase):
+    def test_tokens_to_words(self):
+        Token = namedtuple('Token', ['text', 'timestep', 'start_time'])
+        tokens = [Token(c, i, i * 0.02) for i, c in enumerate('hi  neon')]
+        self.assertEqual(tokens_to_words(tokens), [
+            {'word': 'hi', 'start_time': 0.0, 'end_time': 0.04},
+            {'word': 'neon', 'start_time': 0.08, 'end_time': 0.16}])
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_character_error_rate(self):
+        self.assertEqual(character_error_rate(["neon"], ["neon"]), 0)
+        self.assertEqual(character_error_rate(["neon", "time"],
+                                              ["nean", "tim"]), 0.25)
+        self.assertEqual(character_error_rate([""], ["x"]), 1)
+
+    def test_compare_to_baseline(self):
+        baseline = [{"lang": "en", "beam_width": 500, "concurrency": 1,
+                     "latency_p50": 1.0, "latency_p95": 2.0,
+                     "real_time_factor": 0.5, "cer": 0.05}]
+        same = dict(baseline[0], latency_p50=1.05, cer=0.055)
+        self.assertEqual(compare_to_baseline([same], baseline, 0.1), [])
+        improved = dict(baseline[0], latency_p95=1.0, cer=0.01)
+        self.assertEqual(compare_to_baseline([improved], baseline, 0.1), [])
+
+        slower = dict(baseline[0], latency_p50=1.2, cer=0.07)
+        regressions = compare_to_baseline([slower], baseline, 0.1)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("('en', 500, 1) "
+                                                  "latency_p50"))
+        self.assertIn("cer", regressions[1])
+        self.assertEqual(len(compare_to_baseline([slower], baseline, 0.5)),
+                         1)
+
+        # Configurations or metrics missing from the baseline are skipped
+        other = dict(slower, beam_width=100)
+        self.assertEqual(compare_to_baseline([other], baseline, 0.1), [])
+        partial = [{k: v for k, v in baseline[0].items() if k != "cer"}]
+        self.assertEqual(len(compare_to_baseline([slower], partial, 0.1)), 1)
+
+        # Peak memory is compared per configuration
+        baseline = [dict(baseline[0], peak_rss_mb=500.0)]
+        larger = dict(baseline[0], peak_rss_mb=600.0)
+        regressions = compare_to_baseline([larger], baseline, 0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("peak_rss_mb", regressions[0])
+
+
+class TestMetrics(unittest.TestCase):
+    def test_prometheus_sink(self):
+        sink = PrometheusSink()
+        sink.increment("model_pool_hits", tags={"lang": "en"})
+        sink.increment("model_pool_hits", tags={"lang": "en"})
+        sink.observe("decode_seconds", 0.5, {"lang": "en"})
+        sink.observe("decode_seconds", 1.5, {"lang": "en"})
+        rendered = sink.render().splitlines()
+        self.assertIn('coqui_stt_model_pool_hits_total{lang="en"} 2',
+                      rendered)
+        self.assertIn('coqui_stt_decode_seconds_count{lang="en"} 2', rendered)
+        self.assertIn('coqui_stt_decode_seconds_sum{lang="en"} 2.0', rendered)
+
+    def test_configure_metrics_once(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        config = {"sink": "prometheus", "prometheus_port": port}
+        try:
+            configure_metrics(config)
+            sink = get_metrics_sink()
+            sink.increment("model_pool_hits")
+            # A second plugin instance must not rebind the port or reset
+            configure_metrics(dict(config))
+            self.assertIs(get_metrics_sink(), sink)
+            self.assertIn("coqui_stt_model_pool_hits_total 1",
+                          sink.render().splitlines())
+        finally:
+            set_metrics_sink(MetricsSink())
+
+
+class TestAsyncExecutor(unittest.TestCase):
+    def test_pending_accounting(self):
+        executor = AsyncExecutor(max_workers=1, max_pending=2)
+        started = threading.Event()
+        release = threading.Event()
+
+        def work():
+            started.set()
+            release.wait(5)
+            return "done"
+
+        async def test():
+            running = asyncio.ensure_future(executor.run(work))
+            queued = asyncio.ensure_future(executor.run(work))
+            await asyncio.get_event_loop().run_in_executor(
+                None, started.wait, 5)
+            self.assertEqual(executor.in_flight, 1)
+            self.assertEqual(executor.queue_depth, 1)
+            with self.assertRaises(DecoderSaturatedError):
+                await executor.run(work)
+
+            # Cancelled work that already started is counted until it ends
+            running.cancel()
+            queued.cancel()
+            await asyncio.sleep(0.1)
+            self.assertEqual(executor.in_flight, 1)
+            self.assertEqual(executor.queue_depth, 0)
+            queued = asyncio.ensure_future(executor.run(work))
+            await asyncio.sleep(0)
+            with self.assertRaises(DecoderSaturatedError):
+                await executor.run(work)
+            release.set()
+            self.assertEqual(await queued, "done")
+            self.assertEqual(executor.in_flight + executor.queue_depth, 0)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(test())
+        finally:
+            loop.close()
+            executor.shutdown()
+
+
+class TestResultCache(unittest.TestCase):
+    def test_memory_lru(self):
+        cache = TranscriptionCache(max_entries=2)
+        audio = np.arange(1000, dtype=np.int16)
+        keys = [TranscriptionCache.make_key(audio, 'en', beam)
+                for beam in (100, 500, 1024)]
+        self.assertEqual(len(set(keys)), 3)
+        for key, text in zip(keys, ('a', 'b', 'c')):
+            cache.put(key, text)
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual(cache.get(keys[2]), 'c')
+
+    def test_sqlite_shared(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite')
+            key = TranscriptionCache.make_key(np.zeros(10, np.int16), 'en')
+            TranscriptionCache(sqlite_path=path).put(key, 'neon')
+            self.assertEqual(TranscriptionCache(sqlite_path=path).get(key),
+                             'neon')
+            expired = TranscriptionCache(ttl=-1, sqlite_path=path)
+            self.assertIsNone(expired.get(key))
+
+
+def _unloaded_stt(**config) -> CoquiSTT:
+    """
+    Builds a plugin instance without loading a model.
+    """
+    with mock.patch.object(CoquiSTT, '_get_pooled_model'):
+        return CoquiSTT({'lang': 'en', **config})
+
+
+class TestBeamWidth(unittest.TestCase):
+    _stt = staticmethod(_unloaded_stt)
+
+    @staticmethod
+    def _pooled(decode_cost: float = None) -> PooledModel:
+        pooled = PooledModel('en', object())
+        pooled.decode_cost = decode_cost
+        return pooled
+
+    def test_precedence(self):
+        self.assertEqual(self._stt().get_beam_width('en'),
+                         load_manifest()['en'].beam_width)
+        self.assertEqual(self._stt(decoding_profile='fast')
+                         .get_beam_width('en'), 100)
+        self.assertEqual(self._stt(decoding_profile='fast', beam_width=300)
+                         .get_beam_width('en'), 300)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'models.yml')
+            with open(path, 'w') as f:
+                f.write('en:\n  version: v1\n'
+                        '  model_url: https://example.com/model.pbmm\n'
+                        '  beam_width: 200\n')
+            stt = self._stt(model_manifest=path)
+            self.assertEqual(stt.get_beam_width('en'), 200)
+            self.assertEqual(self._stt(model_manifest=path, beam_width=300)
+                             .get_beam_width('en'), 300)
+        with self.assertRaises(ValueError):
+            self._stt(decoding_profile='slow')
+
+    def test_fixed(self):
+        stt = self._stt(beam_width=500)
+        pooled = self._pooled(decode_cost=0.001)
+        self.assertEqual(stt.select_beam_width(pooled, 60, 0.1), 500)
+
+    def test_long_utterance(self):
+        stt = self._stt(beam_width=500, adaptive_beam_width=True,
+                        long_utterance_length=10)
+        self.assertEqual(stt.select_beam_width(self._pooled(), 5), 500)
+        self.assertEqual(stt.select_beam_width(self._pooled(), 20), 250)
+
+    def test_latency_budget(self):
+        stt = self._stt(beam_width=500, adaptive_beam_width=True,
+                        latency_budget=1.0)
+        # Estimated 0.001 * 5 * 500 = 2.5 seconds
+        pooled = self._pooled(decode_cost=0.001)
+        self.assertEqual(stt.select_beam_width(pooled, 5), 200)
+        self.assertEqual(stt.select_beam_width(pooled, 5, 5.0), 500)
+        # No estimate before the first decode
+        self.assertEqual(stt.select_beam_width(self._pooled(), 5), 500)
+
+    def test_min_beam_width(self):
+        stt = self._stt(beam_width=500, adaptive_beam_width=True)
+        pooled = self._pooled(decode_cost=0.001)
+        self.assertEqual(stt.select_beam_width(pooled, 5, 0.001),
+                         MIN_BEAM_WIDTH)
+        # Never raised above the configured beam width
+        stt = self._stt(beam_width=10, adaptive_beam_width=True)
+        self.assertEqual(stt.select_beam_width(pooled, 5, 0.001), 10)
+
+    def test_alpha_beta(self):
+        model = mock.Mock()
+        pooled = PooledModel('en', model, scorer='en.scorer')
+        configured = self._stt(lm_alpha=0.5, lm_beta=1.5)
+        configured._apply_decoder_settings(pooled)
+        # Weights are set on a reloaded scorer, not the one in-flight
+        # streams share
+        model.enableExternalScorer.assert_called_once_with('en.scorer')
+        model.setScorerAlphaBeta.assert_called_once_with(0.5, 1.5)
+        self.assertEqual(pooled.alpha_beta, (0.5, 1.5))
+
+        # An instance without weights restores the scorer's own
+        model.reset_mock()
+        self._stt()._apply_decoder_settings(pooled)
+        model.enableExternalScorer.assert_called_once_with('en.scorer')
+        model.setScorerAlphaBeta.assert_not_called()
+        self.assertIsNone(pooled.alpha_beta)
+
+        model.reset_mock()
+        self._stt()._apply_decoder_settings(pooled)
+        model.enableExternalScorer.assert_not_called()
+
+
+class _FakeStream:
+    def __init__(self, hotwords: dict):
+        self.hotwords = hotwords
+
+    def feedAudioContent(self, audio):
+        time.sleep(0.01)
+
+    def finishStream(self):
+        return " ".join(sorted(self.hotwords))
+
+
+class _FakeModel:
+    """
+    Model whose streams transcribe to the hot words set when created
+    """
+    def __init__(self):
+        self.hotwords = dict()
+
+    def sampleRate(self):
+        return 16000
+
+    def setBeamWidth(self, beam_width):
+        pass
+
+    def addHotWord(self, word, boost):
+        self.hotwords[word] = boost
+
+    def eraseHotWord(self, word):
+        del self.hotwords[word]
+
+    def createStream(self):
+        return _FakeStream(dict(self.hotwords))
+
+
+class TestHotwords(unittest.TestCase):
+    def test_apply_decoder_settings(self):
+        stt = _unloaded_stt(beam_width=500)
+        model = mock.Mock()
+        pooled = PooledModel('en', model, scorer='en.scorer')
+
+        stt._apply_decoder_settings(pooled, hotwords={'kyiv': 8.0})
+        model.setBeamWidth.assert_called_once_with(500)
+        self.assertEqual(model.addHotWord.call_args_list,
+                         [mock.call('neon', 5.0), mock.call('kyiv', 8.0)])
+        model.eraseHotWord.assert_not_called()
+        self.assertEqual(pooled.hotwords, {'neon': 5.0, 'kyiv': 8.0})
+
+        # Only the changed words are erased and added
+        model.reset_mock()
+        stt._apply_decoder_settings(pooled, hotwords={'lviv': 8.0})
+        model.eraseHotWord.assert_called_once_with('kyiv')
+        model.addHotWord.assert_called_once_with('lviv', 8.0)
+        model.setBeamWidth.assert_not_called()
+        self.assertEqual(pooled.hotwords, {'neon': 5.0, 'lviv': 8.0})
+
+        model.reset_mock()
+        stt._apply_decoder_settings(pooled, hotwords={'lviv': 8.0})
+        self.assertEqual(model.method_calls, [])
+
+        # A changed boost replaces the word
+        model.reset_mock()
+        stt._apply_decoder_settings(pooled, hotwords={'neon': 9.0})
+        self.assertEqual(model.eraseHotWord.call_args_list,
+                         [mock.call('neon'), mock.call('lviv')])
+        model.addHotWord.assert_called_once_with('neon', 9.0)
+        self.assertEqual(pooled.hotwords, {'neon': 9.0})
+
+        # Hot words need a scorer
+        model = mock.Mock()
+        stt._apply_decoder_settings(PooledModel('en', model),
+                                    hotwords={'kyiv': 8.0})
+        model.addHotWord.assert_not_called()
+
+    def test_concurrent_decodes(self):
+        stt = _unloaded_stt()
+        pooled = PooledModel('en', _FakeModel(), scorer='en.scorer')
+        audio = AudioData(np.zeros(1600, dtype=np.int16), 16000, 2)
+        words = ['kyiv', 'lviv', 'odesa', 'kharkiv'] * 4
+        with mock.patch.object(stt, '_get_pooled_model',
+                               return_value=pooled):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(
+                    lambda word: stt._decode(audio, 'en', None,
+                                             hotwords={word: 8.0}), words))
+        for word, result in zip(words, results):
+            self.assertEqual(result, " ".join(sorted(['neon', word])))
+
+
+class TestModelPool(unittest.TestCase):
+    @staticmethod
+    def _loader(size: int = 100, loaded: list = None):
+        def load(lang):
+            if loaded is not None:
+                loaded.append(lang)
+            return PooledModel(lang, object(), size=size)
+        return load
+
+    def test_lru_order(self):
+        pool = ModelPool()
+        loaded = []
+        for lang in ('en', 'de', 'fr'):
+            pool.get(lang, self._loader(loaded=loaded))
+        en = pool.get('en', self._loader(loaded=loaded))
+        self.assertEqual(loaded, ['en', 'de', 'fr'])
+        self.assertIs(pool.get('en', self._loader()), en)
+        self.assertEqual(pool.loaded_languages, ['de', 'fr', 'en'])
+        self.assertTrue(pool.evict('de'))
+        self.assertFalse(pool.evict('de'))
+        self.assertEqual(pool.loaded_languages, ['fr', 'en'])
+
+    def test_memory_budget(self):
+        pool = ModelPool(memory_budget=250)
+        for lang in ('en', 'de'):
+            pool.get(lang, self._loader())
+        pool.get('en', self._loader())
+        pool.get('fr', self._loader())
+        # The least recently used model is evicted first
+        self.assertEqual(pool.loaded_languages, ['en', 'fr'])
+        self.assertEqual(pool.total_size, 200)
+        # A model over budget on its own is still kept
+        pool.get('uk', self._loader(size=1000))
+        self.assertEqual(pool.loaded_languages, ['uk'])
+
+    def test_concurrent_load(self):
+        pool = ModelPool()
+        loaded = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_loader(lang):
+            loaded.append(lang)
+            started.set()
+            release.wait(5)
+            return PooledModel(lang, object())
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(pool.get('en', slow_loader)))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        # Let the other threads queue up behind the loading thread
+        started.wait(5)
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(loaded, ['en'])
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_session_keeps_model(self):
+        pool = ModelPool(memory_budget=150)
+        stt = _unloaded_stt()
+        manager = StreamSessionManager(stt, reap_interval=None)
+        with mock.patch.object(
+                stt, '_get_pooled_model',
+                lambda lang: pool.get(lang, lambda code: PooledModel(
+                    code, _FakeModel(), size=100))):
+            manager.open('session', 'en')
+            model = weakref.ref(pool.get('en', None).model)
+            # Loading another language evicts the session's model
+            stt._get_pooled_model('de')
+        self.assertEqual(pool.loaded_languages, ['de'])
+        gc.collect()
+        self.assertIsNotNone(model())
+        manager.finish('session')
+        gc.collect()
+        self.assertIsNone(model())
+
+    def test_stream_keeps_model(self):
+        pool = ModelPool(memory_budget=150)
+        stt = _unloaded_stt()
+        with mock.patch.object(
+                stt, '_get_pooled_model',
+                lambda lang: pool.get(lang, lambda code: PooledModel(
+                    code, _FakeModel(), size=100))):
+            stt.stream_start('en')
+            model = weakref.ref(pool.get('en', None).model)
+            stt._get_pooled_model('de')
+        gc.collect()
+        self.assertIsNotNone(model())
+        stt.stream_data(np.zeros(160, dtype=np.int16), partial=False)
+        stt.stream_stop()
+        gc.collect()
+        self.assertIsNone(model())
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, content: bytes = b'',
+                 headers: dict = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+class TestModelCache(unittest.TestCase):
+    data = bytes(range(256)) * 40
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'model.pbmm')
+        self.part_path = self.path + '.part'
+        self.requests = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _get(self, supports_range: bool = True, sent: int = None):
+        """
+        Patches requests.get to serve `self.data`, closing each connection
+        after `sent` bytes of the body.
+        """
+        total = len(self.data)
+
+        def get(url, headers=None, **kwargs):
+            self.requests.append(headers)
+            if headers and supports_range:
+                offset = int(headers['Range'][6:-1])
+                if offset >= total:
+                    return _FakeResponse(
+                        416, headers={'Content-Range': f'bytes */{total}'})
+                return _FakeResponse(
+                    206, self.data[offset:][:sent],
+                    {'Content-Length': str(total - offset),
+                     'Content-Range': f'bytes {offset}-{total - 1}/{total}'})
+            return _FakeResponse(200, self.data[:sent],
+                                 {'Content-Length': str(total)})
+        return mock.patch('requests.get', side_effect=get)
+
+    def _read(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def _write_part(self, data: bytes):
+        with open(self.part_path, 'wb') as f:
+            f.write(data)
+
+    def test_download(self):
+        sha256 = hashlib.sha256(self.data).hexdigest()
+        with self._get():
+            download_file('url', self.path, sha256, len(self.data),
+                          chunk_size=1000)
+            self.assertEqual(self._read(), self.data)
+            self.assertFalse(os.path.exists(self.part_path))
+            # Existing files are not downloaded again
+            download_file('url', self.path)
+        self.assertEqual(self.requests, [{}])
+
+    def test_resume(self):
+        self._write_part(self.data[:1000])
+        with self._get():
+            download_file('url', self.path, chunk_size=1000)
+        self.assertEqual(self.requests, [{'Range': 'bytes=1000-'}])
+        self.assertEqual(self._read(), self.data)
+
+    def test_restart_without_range_support(self):
+        self._write_part(self.data[:1000])
+        with self._get(supports_range=False):
+            download_file('url', self.path, chunk_size=1000)
+        self.assertEqual(self._read(), self.data)
+
+    def test_part_complete(self):
+        self._write_part(self.data)
+        with self._get():
+            download_file('url', self.path, size=len(self.data))
+        self.assertEqual(self.requests,
+                         [{'Range': f'bytes={len(self.data)}-'}])
+        self.assertEqual(self._read(), self.data)
+
+    def test_mismatch_removes_part(self):
+        for kwargs in ({'sha256': '0' * 64}, {'size': len(self.data) + 1}):
+            with self._get(), self.assertRaises(ValueError):
+                download_file('url', self.path, **kwargs)
+            self.assertFalse(os.path.exists(self.part_path))
+            self.assertFalse(os.path.exists(self.path))
+
+    def test_truncated(self):
+        # Short transfers are resumed until the reported size is received
+        with self._get(sent=4000):
+            download_file('url', self.path)
+        self.assertEqual(self.requests, [{}, {'Range': 'bytes=4000-'},
+                                         {'Range': 'bytes=8000-'}])
+        self.assertEqual(self._read(), self.data)
+
+    def test_truncated_without_range_support(self):
+        with self._get(supports_range=False, sent=3000), \
+                self.assertRaises(requests.RequestException):
+            download_file('url', self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_downloaded_while_waiting_for_lock(self):
+        @contextlib.contextmanager
+        def other_process_finished(lock_path):
+            with open(self.path, 'wb') as f:
+                f.write(self.data)
+            yield
+
+        with self._get(), mock.patch(
+                'neon_stt_plugin_coqui.model_cache._file_lock',
+                other_process_finished):
+            download_file('url', self.path)
+        self.assertEqual(self.requests, [])
+        self.assertEqual(self._read(), self.data)
+
+
+class TestManifest(unittest.TestCase):
+    def test_bundled_manifest(self):
+        manifest = load_manifest()
+        self.assertIs(manifest, load_manifest())
+        self.assertEqual(manifest.get('en-US').lang, 'en')
+        self.assertEqual(manifest.get('ga-ie').lang, 'ga-IE')
+        self.assertIsNone(manifest['cnh'].scorer_url)
+        for lang in manifest:
+            self.assertEqual(manifest[lang].sample_rate, 16000)
+        with self.assertRaises(RuntimeError):
+            manifest.get('xx')
+
+    def test_invalid_entries(self):
+        url = 'https://example.com/model.pbmm'
+        with self.assertRaises(ValueError):
+            parse_entry('en', {'version': 'v1'})
+        with self.assertRaises(ValueError):
+            parse_entry('en', {'version': 'v1', 'model_url': url,
+                               'model_sha256': 'abc'})
+        with self.assertRaises(ValueError):
+            parse_entry('en', {'version': 'v1', 'model_url': url,
+                               'lm_alpha': 0.9})
+        info = parse_entry('en', {'version': 'v1', 'model_url': url,
+                                  'lm_alpha': 0.9, 'lm_beta': 1})
+        self.assertEqual(info.alpha_beta, (0.9, 1.0))
+
+    def test_record_checksums(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'models.yml')
+            with open(path, 'w') as f:
+                f.write('# header\nen:\n  version: v1\n'
+                        '  model_url: https://example.com/model.pbmm\n'
+                        '  model_sha256: null\n')
+            model_path = os.path.join(tmp, 'model.pbmm')
+            with open(model_path, 'wb') as f:
+                f.write(b'model')
+            self.assertEqual(record_checksums(path, {'en': {
+                'model': model_path}}), 2)
+            info = load_manifest(path)['en']
+            self.assertEqual(info.model_size, 5)
+            self.assertEqual(len(info.model_sha256), 64)
+            with open(path) as f:
+                self.assertTrue(f.readline().startswith('# header'))
+
+
+class TestAudioUtils(unittest.TestCase):
+    def test_convert_audio(self):
+        sr = 44100
+        t = np.arange(sr) / sr
+        # 440Hz should pass through, 12kHz is above the 8kHz Nyquist limit
+        tone = 10000 * np.sin(2 * np.pi * 440 * t)
+        noise = 5000 * np.sin(2 * np.pi * 12000 * t)
+        stereo = np.repeat((tone + noise).astype(np.int16), 2)
+        converted = convert_audio(stereo, sr, 16000, channels=2)
+        self.assertEqual(converted.dtype, np.int16)
+        self.assertEqual(len(converted), 16000)
+        expected = 10000 * np.sin(2 * np.pi * 440 * np.arange(16000) / 16000)
+        self.assertLess(np.abs(converted - expected)[100:-100].max(), 50)
+
+    def test_read_wav(self):
+        male_folder = TEST_PATH_EN + '/male'
+        for file in os.listdir(male_folder):
+            with wave.open(male_folder + '/' + file, 'rb') as fin:
+                expected = np.frombuffer(fin.readframes(fin.getnframes()),
+                                         np.int16)
+                sample_rate = fin.getframerate()
+            audio, sr, channels = read_wav(male_folder + '/' + file)
+            self.assertEqual(sr, sample_rate)
+            self.assertTrue(np.array_equal(audio, expected))
+
+    def test_pcm_to_int16(self):
+        self.assertEqual(pcm_to_int16(np.array([0, 128, 255], np.uint8))
+                         .tolist(), [-32768, 0, 32512])
+        self.assertEqual(pcm_to_int16(np.array([-1.0, 0.5, 1.0])).tolist(),
+                         [-32767, 16384, 32767])
+        self.assertEqual(pcm_to_int16(np.array([1 << 16, -(1 << 31)],
+                                               np.int32)).tolist(),
+                         [1, -32768])
+        # Little-endian 24-bit samples 256 and -1
+        int24 = np.array([[0, 1, 0], [255, 255, 255]], np.uint8)
+        self.assertEqual(pcm_to_int16(int24).tolist(), [1, -1])
+
+    def test_split_on_silence(self):
+        sr = 16000
+        rng = np.random.default_rng(0)
+        speech = (3000 * rng.standard_normal(sr)).astype(np.int16)
+        silence = (10 * rng.standard_normal(sr)).astype(np.int16)
+        audio = np.concatenate([silence, speech, silence, speech, silence])
+        segments = split_on_silence(audio, sr)
+        self.assertEqual(len(segments), 2)
+        for (start, end), speech_start in zip(segments, (sr, 3 * sr)):
+            self.assertLessEqual(start, speech_start)
+            self.assertGreaterEqual(end, speech_start + sr)
+        self.assertEqual(split_on_silence(silence, sr), [])
+        segments = split_on_silence(speech, sr, max_segment=0.3)
+        self.assertEqual(segments[0][0], 0)
+        self.assertEqual(segments[-1][1], sr)
+        for start, end in segments:
+            self.assertLessEqual(end - start, 0.3 * sr)
+        # Shorter than two frames must still terminate
+        segments = split_on_silence(speech, sr, max_segment=0.01)
+        self.assertEqual(segments[-1][1], sr)
+
+    def test_frame_energy(self):
+        rng = np.random.default_rng(0)
+        audio = (3000 * rng.standard_normal(100003)).astype(np.int16)
+        frame_length = 480
+        padded = np.zeros(-(-len(audio) // frame_length) * frame_length)
+        padded[:len(audio)] = audio
+        expected = np.sqrt(np.mean(
+            np.square(padded.reshape(-1, frame_length)), axis=1))
+        np.testing.assert_allclose(frame_energy(audio, frame_length),
+                                   expected, rtol=1e-4)
+
+    def test_preprocess(self):
+        sr = 16000
+        rng = np.random.default_rng(0)
+        t = np.arange(sr // 2) / sr
+        tone = 5000 * np.sin(2 * np.pi * 440 * t)
+        audio = np.concatenate((np.zeros(sr), tone, np.zeros(sr)))
+        audio = (audio + 500 + rng.normal(0, 20, len(audio))).astype(np.int16)
+
+        processed, offset = preprocess(audio, sr, {'normalize': 'peak'})
+        self.assertEqual(processed.dtype, np.int16)
+        self.assertAlmostEqual(offset / sr, 0.8, delta=0.05)
+        self.assertAlmostEqual(len(processed) / sr, 0.9, delta=0.1)
+        self.assertLess(abs(np.mean(processed)), 100)
+        self.assertGreater(np.max(np.abs(processed)), 28000)
+
+        trimmed, offset = preprocess(audio, sr, {'remove_dc': False})
+        self.assertTrue(np.shares_memory(trimmed, audio))
+        np.testing.assert_array_equal(trimmed,
+                                      audio[offset:offset + len(trimmed)])
+
+        gated = noise_gate(audio.astype(np.float32) - 500, sr, 100)
+        self.assertFalse(gated[:sr // 2].any())
+        self.assertTrue(gated[sr:sr + sr // 2].any())
+
+        with self.assertRaises(ValueError):
+            preprocessing_options({'normalise': 'peak'})
+        with self.assertRaises(ValueError):
+            preprocessing_options({'normalize': 'loudness'})
+
 
 if __name__ == '__main__':
     unittest.main()